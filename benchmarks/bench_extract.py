@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Benchmarks HTML-to-text extraction and search result parsing over the saved pages in benchmarks/corpus.
+
+    python benchmarks/bench_extract.py [--repeat N]
+
+When beautifulsoup4 is installed, the previous BeautifulSoup-based implementation is timed as well
+and its output is compared with the current one.
+"""
+import os
+import re
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search_tool import extract_relevant_text, parse_search_results
+
+try:
+    from bs4 import BeautifulSoup
+except ImportError:
+    BeautifulSoup = None
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+
+def legacy_extract_relevant_text(html):
+    soup = BeautifulSoup(html, "html.parser")
+    allowed_tags = {"p", "article", "b"}
+    allowed_pattern = re.compile(r'^[A-Za-z0-9\s\.,!\?\'":;\-]+$')
+    texts = []
+    for tag in soup.find_all(allowed_tags):
+        txt = tag.get_text(separator=" ", strip=True)
+        if not txt:
+            continue
+        if len(txt) >= 100 or (len(txt) >= 50 and txt.count(" ") >= 4 and allowed_pattern.match(txt)):
+            texts.append(txt)
+    unique_texts = list(dict.fromkeys(texts))
+    joined_text = "\n".join(unique_texts)
+    filtered = [line for line in joined_text.splitlines() if len("".join(line.split())) > 50]
+    return "\n\n".join(filtered)
+
+def legacy_parse_search_results(html):
+    soup = BeautifulSoup(html, "html.parser")
+    results = []
+    for a_tag in soup.select("a.result__a[href]"):
+        container = a_tag.find_parent("div", class_="result")
+        if container and "result--ad" in container.get("class", []):
+            continue
+        snippet_tag = container.select_one(".result__snippet") if container else None
+        results.append({
+            "link": a_tag["href"],
+            "title": a_tag.get_text(strip=True),
+            "snippet": snippet_tag.get_text(separator=" ", strip=True) if snippet_tag else "No snippet"
+        })
+    if results:
+        return results
+    for header in soup.find_all("h2", class_=lambda c: c and "LnpumSThxEWMIsDdAT17" in c):
+        a_tag = header.find("a", href=True)
+        if not a_tag:
+            continue
+        snippet_div = header.find_next("div", class_=lambda c: c and "E2eLOJr8HctVnDOTM8fs" in c)
+        results.append({
+            "link": a_tag["href"],
+            "title": a_tag.get_text(strip=True),
+            "snippet": snippet_div.get_text(separator=" ", strip=True) if snippet_div else "No snippet"
+        })
+    return results
+
+def best_time(fn, html, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(html)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def compare_text(legacy, current):
+    legacy_lines = set(legacy.split("\n\n")) - {""}
+    current_lines = set(current.split("\n\n")) - {""}
+    missing = len(legacy_lines - current_lines)
+    return f"{len(current_lines)} lines, {missing} legacy lines missing"
+
+def compare_results(legacy, current):
+    same = [(r["title"], r["snippet"]) for r in legacy] == [(r["title"], r["snippet"]) for r in current]
+    return f"{len(current)} results, {'identical' if same else 'DIFFERENT'}"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    header = f"{'page':<28} {'kind':<8} {'size':>8} {'current ms':>11} {'legacy ms':>10} {'speedup':>8}  output"
+    print(header)
+    print("-" * len(header))
+    for name in sorted(os.listdir(CORPUS_DIR)):
+        if not name.endswith(".html"):
+            continue
+        with open(os.path.join(CORPUS_DIR, name), encoding="utf-8") as f:
+            html = f.read()
+        is_results_page = name.startswith("ddg_")
+        current_fn = parse_search_results if is_results_page else extract_relevant_text
+        legacy_fn = legacy_parse_search_results if is_results_page else legacy_extract_relevant_text
+        current = best_time(current_fn, html, args.repeat)
+        if BeautifulSoup is None:
+            print(f"{name:<28} {'search' if is_results_page else 'extract':<8} {len(html):>8} {current * 1000:>11.2f}")
+            continue
+        legacy = best_time(legacy_fn, html, args.repeat)
+        compare = compare_results if is_results_page else compare_text
+        print(f"{name:<28} {'search' if is_results_page else 'extract':<8} {len(html):>8} {current * 1000:>11.2f} "
+              f"{legacy * 1000:>10.2f} {legacy / current:>7.1f}x  {compare(legacy_fn(html), current_fn(html))}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Records full research runs into fixtures and replays them offline to benchmark the pipeline.
+
+    python benchmarks/bench_research.py record --fixtures DIR --query "..." [--query "..."]
+    python benchmarks/bench_research.py replay --fixtures DIR [--repeat N] [--llm-latency S] [--page-latency S]
+
+Recording needs the network and the LLMs configured in .env. Replaying needs neither.
+It reports per-query latency, LLM calls, searches, pages fetched and peak Python memory (tracemalloc).
+Replays must use the same researcher settings as the recording, because LLM responses are looked up
+by prompt. Prompts that were not recorded are counted as misses.
+"""
+import os
+import sys
+import time
+import logging
+import argparse
+import tempfile
+import statistics
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Caches would hide the work being measured, and the browser is only started if a page actually needs it.
+os.environ["SCRAPER_CACHE"] = "false"
+os.environ["LLM_CACHE"] = "false"
+os.environ["SCRAPER_POOL_WARMUP"] = "false"
+
+from replay import FixtureStore, RecordingScraper, RecordingLLM, ReplayScraper, FakeLLM
+
+def researchers(lead):
+    return [lead, *lead.tools]
+
+def run_query(lead, query):
+    from main import ResearchSession
+    with tempfile.TemporaryDirectory() as notebook_dir:
+        return lead.process_query(query, ResearchSession(notebook_dir=notebook_dir))
+
+def record(args):
+    from main import initialize_research_team
+    store = FixtureStore(args.fixtures)
+    lead = initialize_research_team(scraper=RecordingScraper(store))
+    for researcher in researchers(lead):
+        researcher.llm = RecordingLLM(researcher.llm, store)
+    for query in args.query:
+        print(f"Recording: {query}")
+        store.add_query(query)
+        run_query(lead, query)
+        store.save()
+    print(f"Saved {len(store.data['search'])} result pages, {len(store.data['pages'])} pages and "
+          f"{len(store.data['llm'])} LLM responses to {args.fixtures}")
+
+def counters(scraper, llms):
+    return {"llm_calls": sum(llm.calls for llm in llms), "llm_misses": sum(llm.misses for llm in llms),
+            "searches": scraper.searches, "pages": scraper.pages_fetched, "missing": scraper.pages_missing}
+
+def replay(args):
+    os.environ.setdefault("OPENAI_API_KEY", "replay")
+    from main import initialize_research_team
+    logging.getLogger().setLevel(logging.WARNING)
+    store = FixtureStore(args.fixtures)
+    queries = args.query or store.data["queries"]
+    if not queries:
+        sys.exit(f"No recorded queries in {args.fixtures}")
+    scraper = ReplayScraper(store, search_latency=args.search_latency, page_latency=args.page_latency)
+    lead = initialize_research_team(scraper=scraper)
+    llms = []
+    for researcher in researchers(lead):
+        researcher.llm = FakeLLM(store, latency=args.llm_latency, token_latency=args.token_latency)
+        llms.append(researcher.llm)
+
+    header = (f"{'query':<40} {'mean s':>8} {'min s':>8} {'llm':>5} {'miss':>5} {'search':>6} "
+              f"{'pages':>5} {'missing':>7} {'peak MB':>8}")
+    print(header)
+    print("-" * len(header))
+    for query in queries:
+        timings = []
+        for _ in range(args.repeat):
+            before = counters(scraper, llms)
+            start = time.perf_counter()
+            run_query(lead, query)
+            timings.append(time.perf_counter() - start)
+            after = counters(scraper, llms)
+        # Memory is measured in a separate run because tracemalloc slows Python code down considerably.
+        tracemalloc.start()
+        run_query(lead, query)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        counts = {key: after[key] - before[key] for key in after}
+        label = query if len(query) <= 40 else query[:37] + "..."
+        print(f"{label:<40} {statistics.mean(timings):>8.2f} {min(timings):>8.2f} {counts['llm_calls']:>5} "
+              f"{counts['llm_misses']:>5} {counts['searches']:>6} {counts['pages']:>5} {counts['missing']:>7} "
+              f"{peak / 1024 / 1024:>8.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("mode", choices=["record", "replay"])
+    parser.add_argument("--fixtures", required=True, help="fixture directory to write or read")
+    parser.add_argument("--query", action="append", default=[], help="query to research (repeatable)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="seconds added to every LLM call")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="seconds added per response token")
+    parser.add_argument("--search-latency", type=float, default=0.0, help="seconds added to every search")
+    parser.add_argument("--page-latency", type=float, default=0.0, help="seconds added to every page fetch")
+    args = parser.parse_args()
+    if args.mode == "record":
+        if not args.query:
+            parser.error("record needs at least one --query")
+        record(args)
+    else:
+        replay(args)
+
+if __name__ == "__main__":
+    main()
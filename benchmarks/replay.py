@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Record/replay components for offline benchmarks of full research runs.
+
+Recording wraps the live scraper and LLMs and saves every search result page, result page and
+LLM response to a fixture directory. Replaying serves them back through ReplayScraper and FakeLLM,
+so a run needs no network, browser or model server.
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search_tool import WebSearchScraper, normalize_query, normalize_url
+from tokens import estimate_tokens
+
+def prompt_key(prompt):
+    return hashlib.sha256(json.dumps(prompt, sort_keys=True).encode("utf-8")).hexdigest()
+
+class FixtureStore:
+    """
+    A fixture directory with one JSON file per kind of recording:
+    search.json (result pages by engine and normalized query), pages.json (HTML by normalized URL),
+    llm.json (responses by prompt hash) and queries.json (the recorded research queries).
+    """
+    KINDS = ("search", "pages", "llm", "queries")
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.data = {}
+        for kind in self.KINDS:
+            file_path = os.path.join(path, f"{kind}.json")
+            if os.path.exists(file_path):
+                with open(file_path, encoding="utf-8") as f:
+                    self.data[kind] = json.load(f)
+            else:
+                self.data[kind] = [] if kind == "queries" else {}
+
+    def get(self, kind, key):
+        with self._lock:
+            return self.data[kind].get(key)
+
+    def put(self, kind, key, value):
+        with self._lock:
+            self.data[kind][key] = value
+
+    def add_query(self, query):
+        with self._lock:
+            if query not in self.data["queries"]:
+                self.data["queries"].append(query)
+
+    def save(self):
+        os.makedirs(self.path, exist_ok=True)
+        with self._lock:
+            for kind in self.KINDS:
+                with open(os.path.join(self.path, f"{kind}.json"), "w", encoding="utf-8") as f:
+                    json.dump(self.data[kind], f, indent=1, sort_keys=kind != "queries")
+
+class RecordingScraper(WebSearchScraper):
+    """Live scraper that saves every search result page and downloaded result page to the fixture store."""
+    def __init__(self, store):
+        super().__init__()
+        self.store = store
+
+    def duckduckgo_html_search(self, query):
+        html = super().duckduckgo_html_search(query)
+        if html:
+            self.store.put("search", f"http:{normalize_query(query)}", html)
+        return html
+
+    def duckduckgo_search_scrape(self, query):
+        html = super().duckduckgo_search_scrape(query)
+        self.store.put("search", f"render:{normalize_query(query)}", html)
+        return html
+
+    def _download_page(self, url):
+        html, text = super()._download_page(url)
+        if html is not None:
+            self.store.put("pages", normalize_url(url), html)
+        return html, text
+
+class RecordingLLM:
+    """Wraps a live LLM and saves each response under the hash of its prompt."""
+    def __init__(self, llm, store):
+        self.llm = llm
+        self.store = store
+
+    def invoke(self, prompt, **kwargs):
+        response = self.llm.invoke(prompt, **kwargs)
+        self.store.put("llm", prompt_key(prompt), response)
+        return response
+
+    __call__ = invoke
+
+    def stream(self, prompt, **kwargs):
+        chunks = []
+        for chunk in self.llm.stream(prompt, **kwargs):
+            chunks.append(chunk)
+            yield chunk
+        self.store.put("llm", prompt_key(prompt), "".join(chunks))
+
+class ReplayScraper(WebSearchScraper):
+    """
+    Scraper whose network access is served from the fixture store. Result parsing and text extraction
+    still run for real. Each search and page fetch sleeps for the configured latency.
+    Unrecorded searches return no results, and unrecorded pages come back empty.
+    """
+    def __init__(self, store, search_latency=0.0, page_latency=0.0):
+        super().__init__()
+        self.store = store
+        self.search_latency = search_latency
+        self.page_latency = page_latency
+        self._lock = threading.Lock()
+        self.searches = 0
+        self.pages_fetched = 0
+        self.pages_missing = 0
+
+    def duckduckgo_html_search(self, query):
+        time.sleep(self.search_latency)
+        with self._lock:
+            self.searches += 1
+        return self.store.get("search", f"http:{normalize_query(query)}") or ""
+
+    def duckduckgo_search_scrape(self, query):
+        return self.store.get("search", f"render:{normalize_query(query)}") or ""
+
+    def _download_page(self, url):
+        time.sleep(self.page_latency)
+        html = self.store.get("pages", normalize_url(url))
+        with self._lock:
+            if html is None:
+                self.pages_missing += 1
+            else:
+                self.pages_fetched += 1
+        if html is None:
+            return None, ""
+        return html, self.extract_relevant_text(html)
+
+class FakeLLM:
+    """
+    Serves recorded responses by prompt hash. Each call sleeps for `latency` seconds plus
+    `token_latency` seconds per estimated response token. Unrecorded prompts get `default`.
+    """
+    def __init__(self, store, latency=0.0, token_latency=0.0, default="NO"):
+        self.store = store
+        self.latency = latency
+        self.token_latency = token_latency
+        self.default = default
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.misses = 0
+
+    def _respond(self, prompt):
+        response = self.store.get("llm", prompt_key(prompt))
+        with self._lock:
+            self.calls += 1
+            if response is None:
+                self.misses += 1
+        return response if response is not None else self.default
+
+    def invoke(self, prompt, **kwargs):
+        response = self._respond(prompt)
+        time.sleep(self.latency + self.token_latency * estimate_tokens(response))
+        return response
+
+    __call__ = invoke
+
+    def stream(self, prompt, **kwargs):
+        response = self._respond(prompt)
+        time.sleep(self.latency)
+        words = response.split(" ")
+        for i, word in enumerate(words):
+            chunk = word if i == len(words) - 1 else word + " "
+            time.sleep(self.token_latency * estimate_tokens(chunk))
+            yield chunk
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+import re
+from tokens import estimate_tokens
+
+SENTENCE_END = re.compile(r"[.!?][\"')\]]*\s+(?=[\"'(\[]?[A-Z0-9])")
+# A period after these does not end a sentence: titles, company suffixes and other common abbreviations,
+# single initials ("J.") and dotted initialisms ("U.S.", "e.g.").
+ABBREVIATIONS = {
+    "mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "mt", "gen", "gov", "sen", "rep", "rev", "capt", "lt", "col",
+    "sgt", "inc", "ltd", "co", "corp", "bros", "dept", "univ", "assn", "vs", "etc", "approx", "est",
+    "fig", "vol", "pp", "jan", "feb", "mar", "apr", "jun", "jul", "aug", "sep", "sept", "oct", "nov", "dec",
+}
+INITIALS = re.compile(r"(?:[A-Za-z]\.)*[A-Za-z]")
+
+def _is_abbreviation(sentence):
+    """Whether the period just after `sentence` closes an abbreviation rather than the sentence."""
+    words = sentence.rsplit(None, 1)
+    if not words:
+        return False
+    word = words[-1].lstrip("\"'([")
+    if word.lower() in ABBREVIATIONS:
+        return True
+    return INITIALS.fullmatch(word) is not None and ("." in word or word.isupper())
+
+def split_sentences(text):
+    """
+    Splits after ., ! or ? (and any closing quotes or brackets) when the next word starts with a capital or digit,
+    except after an abbreviation or initial ("Dr. Smith", "U.S. GDP").
+    """
+    sentences = []
+    start = 0
+    for match in SENTENCE_END.finditer(text):
+        if text[match.start()] == "." and _is_abbreviation(text[start:match.start()]):
+            continue
+        end = match.start() + len(match.group().rstrip())
+        sentences.append(text[start:end].strip())
+        start = match.end()
+    sentences.append(text[start:].strip())
+    return [sentence for sentence in sentences if sentence]
+
+def _split_words(text, max_tokens):
+    """Last resort for a single sentence over the limit: consecutive runs of words within max_tokens."""
+    pieces = []
+    piece = []
+    for word in text.split():
+        if piece and estimate_tokens(" ".join(piece + [word])) > max_tokens:
+            pieces.append(" ".join(piece))
+            piece = []
+        piece.append(word)
+    if piece:
+        pieces.append(" ".join(piece))
+    return pieces
+
+def _split_block(text, max_tokens):
+    """Splits a paragraph over max_tokens on sentence boundaries into pieces within max_tokens."""
+    pieces = []
+    piece = []
+    piece_tokens = 0
+    for sentence in split_sentences(text):
+        tokens = estimate_tokens(sentence)
+        if tokens > max_tokens:
+            if piece:
+                pieces.append(" ".join(piece))
+                piece, piece_tokens = [], 0
+            pieces += _split_words(sentence, max_tokens)
+            continue
+        if piece and piece_tokens + tokens > max_tokens:
+            pieces.append(" ".join(piece))
+            piece, piece_tokens = [], 0
+        piece.append(sentence)
+        piece_tokens += tokens
+    if piece:
+        pieces.append(" ".join(piece))
+    return pieces
+
+def _overlap_tail(text, overlap_tokens):
+    """The longest run of whole sentences at the end of text within overlap_tokens."""
+    tail = []
+    tail_tokens = 0
+    for sentence in reversed(split_sentences(text)):
+        tokens = estimate_tokens(sentence)
+        if tail_tokens + tokens > overlap_tokens:
+            break
+        tail.insert(0, sentence)
+        tail_tokens += tokens
+    return " ".join(tail)
+
+def chunk_text(text, target_tokens=150, overlap_tokens=20):
+    """
+    Turns page text (one paragraph per line) into assessment chunks of up to about `target_tokens`.
+    1) Adjacent paragraphs are merged while they fit in the target.
+    2) A paragraph over the target is split on sentence boundaries, and a sentence over it on words.
+    3) Each chunk after the first starts with the last sentences of the previous chunk, up to `overlap_tokens`
+       and as far as the target leaves room, so a statement split across chunks is still seen whole.
+    """
+    pieces = []
+    for paragraph in text.split("\n"):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if estimate_tokens(paragraph) > target_tokens:
+            pieces += _split_block(paragraph, target_tokens)
+        else:
+            pieces.append(paragraph)
+    chunks = []
+    chunk = []
+    chunk_tokens = 0
+    for piece in pieces:
+        tokens = estimate_tokens(piece)
+        if chunk and chunk_tokens + tokens > target_tokens:
+            chunks.append("\n".join(chunk))
+            # The overlap is shortened, or left out, so the new chunk still fits in the target.
+            tail_budget = min(overlap_tokens, target_tokens - tokens)
+            tail = _overlap_tail(chunk[-1], tail_budget) if tail_budget > 0 else ""
+            chunk = [tail] if tail else []
+            chunk_tokens = estimate_tokens(tail)
+        chunk.append(piece)
+        chunk_tokens += tokens
+    if chunk:
+        chunks.append("\n".join(chunk))
+    return chunks
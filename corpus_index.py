@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+import os
+import re
+import json
+import math
+import mmap
+import heapq
+import logging
+import threading
+from array import array
+from collections import Counter
+from ranking import tokenize
+from lxml import html as lxml_html
+from lxml import etree
+from search_tool import extract_relevant_text
+
+logger = logging.getLogger(__name__)
+
+CORPUS_EXTENSIONS = {".txt", ".md", ".markdown", ".html", ".htm"}
+MARKDOWN_PREFIX = re.compile(r"^\s{0,3}(#{1,6}\s+|>\s?|[-*+]\s+|\d+[.)]\s+)")
+# Inline code is matched first so it is kept as written; emphasis markers are only removed in pairs around words.
+MARKDOWN_EMPHASIS = re.compile(r"(`[^`]*`)|(?<![\w*])(\*{1,3}|_{1,3})(?=[^\s*_])(.+?)(?<=[^\s*_])\2(?![\w*])")
+
+def strip_markdown(line):
+    return MARKDOWN_EMPHASIS.sub(lambda m: m.group(1) or m.group(3), MARKDOWN_PREFIX.sub("", line))
+
+def read_document(path):
+    """Returns (title, text) of a corpus file; the text has one paragraph per line."""
+    with open(path, encoding="utf-8", errors="replace") as f:
+        content = f.read()
+    title = os.path.splitext(os.path.basename(path))[0]
+    if os.path.splitext(path)[1].lower() in (".html", ".htm"):
+        try:
+            title = " ".join((lxml_html.document_fromstring(content).findtext(".//title") or "").split()) or title
+        except (etree.ParserError, ValueError):
+            pass
+        return title, "\n".join(extract_relevant_text(content).split("\n\n"))
+    paragraphs = []
+    for block in re.split(r"\n\s*\n", content):
+        lines = [strip_markdown(line).strip() for line in block.splitlines()]
+        paragraph = " ".join(line for line in lines if line)
+        if paragraph:
+            paragraphs.append(paragraph)
+    heading = next((line for line in content.splitlines() if line.startswith("# ")), None)
+    if heading:
+        title = heading[2:].strip()
+    return title, "\n".join(paragraphs)
+
+class CorpusIndex:
+    """
+    On-disk BM25 inverted index over a directory of text, Markdown and HTML files.
+    1) The index is a list of segments. Each has a term table (JSON: term -> [offset, count]) and a postings
+       file of (document id, term frequency) uint32 pairs, memory-mapped on open rather than read.
+    2) `update()` compares file sizes and modification times with the index. New and changed files go into
+       a new segment; changed and deleted files are marked dead. Once dead documents or segments pile up,
+       the index is rebuilt in one segment.
+    3) Scores match ranking.BM25 over the live documents.
+    """
+    def __init__(self, corpus_dir, index_dir, k1=1.5, b=0.75, max_segments=8):
+        self.corpus_dir = os.path.abspath(corpus_dir)
+        self.index_dir = index_dir
+        self.k1 = k1
+        self.b = b
+        self.max_segments = max_segments
+        self._lock = threading.RLock()
+        self.docs = []
+        self.segments = []
+        self.next_segment = 0
+        self._open_segments = {}
+        self.live_count = 0
+        self.avg_length = 0.0
+        self._load()
+
+    def _manifest_path(self):
+        return os.path.join(self.index_dir, "manifest.json")
+
+    def _segment_paths(self, segment):
+        return (os.path.join(self.index_dir, f"segment-{segment}.terms.json"),
+                os.path.join(self.index_dir, f"segment-{segment}.postings"))
+
+    def _load(self):
+        path = self._manifest_path()
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest.get("corpus_dir") != self.corpus_dir:
+                logger.info(f"CorpusIndex: Index in {self.index_dir} belongs to another corpus; rebuilding.")
+                return
+            self.docs = manifest["docs"]
+            self.segments = manifest["segments"]
+            self.next_segment = manifest["next_segment"]
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"CorpusIndex: Unreadable index manifest ({e}); rebuilding.")
+            self.docs, self.segments, self.next_segment = [], [], 0
+
+    def _save_manifest(self):
+        manifest = {"corpus_dir": self.corpus_dir, "docs": self.docs, "segments": self.segments,
+                    "next_segment": self.next_segment}
+        tmp_path = self._manifest_path() + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self._manifest_path())
+
+    def _scan(self):
+        files = {}
+        for directory, _, names in os.walk(self.corpus_dir):
+            for name in names:
+                if os.path.splitext(name)[1].lower() in CORPUS_EXTENSIONS:
+                    path = os.path.join(directory, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    files[path] = (stat.st_mtime, stat.st_size)
+        return files
+
+    def _write_segment(self, doc_ids):
+        """Indexes the given documents into a new segment and returns its number, or None if nothing was indexed."""
+        postings = {}
+        for doc_id in doc_ids:
+            doc = self.docs[doc_id]
+            try:
+                title, text = read_document(doc["path"])
+            except OSError as e:
+                logger.warning(f"CorpusIndex: Cannot read {doc['path']}: {e}")
+                doc["live"] = False
+                continue
+            tokens = tokenize(title + "\n" + text)
+            snippet = next((paragraph for paragraph in text.split("\n") if paragraph != title), "")
+            doc.update(title=title, length=len(tokens), snippet=snippet[:300])
+            for term, freq in Counter(tokens).items():
+                postings.setdefault(term, []).append((doc_id, freq))
+        if not postings:
+            return None
+        segment = self.next_segment
+        self.next_segment += 1
+        terms = {}
+        values = array("I")
+        for term, entries in postings.items():
+            terms[term] = [len(values) // 2, len(entries)]
+            for doc_id, freq in entries:
+                values.append(doc_id)
+                values.append(freq)
+        terms_path, postings_path = self._segment_paths(segment)
+        with open(postings_path, "wb") as f:
+            values.tofile(f)
+        with open(terms_path, "w", encoding="utf-8") as f:
+            json.dump(terms, f)
+        return segment
+
+    def _remove_segment_files(self, segment):
+        self._close_segment(segment)
+        for path in self._segment_paths(segment):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def update(self):
+        """Brings the index up to date with the corpus directory and returns the number of files (re)indexed."""
+        with self._lock:
+            os.makedirs(self.index_dir, exist_ok=True)
+            files = self._scan()
+            indexed = {}
+            removed = 0
+            for doc_id, doc in enumerate(self.docs):
+                if not doc["live"]:
+                    continue
+                if files.get(doc["path"]) == (doc["mtime"], doc["size"]):
+                    indexed[doc["path"]] = doc_id
+                else:
+                    doc["live"] = False
+                    removed += 1
+            changed = [path for path in sorted(files) if path not in indexed]
+            dead = sum(1 for doc in self.docs if not doc["live"])
+            if not changed and not removed:
+                self.open()
+                return 0
+            rebuild = (not self.segments or dead > len(self.docs) // 2 or len(self.segments) >= self.max_segments)
+            old_segments = self.segments
+            if rebuild:
+                paths = sorted(files)
+                self.docs = []
+                self.segments = []
+            else:
+                paths = changed
+            first = len(self.docs)
+            for path in paths:
+                mtime, size = files[path]
+                self.docs.append({"path": path, "mtime": mtime, "size": size, "live": True,
+                                  "title": "", "length": 0, "snippet": ""})
+            segment = self._write_segment(range(first, len(self.docs)))
+            if segment is not None:
+                self.segments.append(segment)
+            self._save_manifest()
+            if rebuild:
+                for old in old_segments:
+                    self._remove_segment_files(old)
+            logger.info(f"CorpusIndex: Indexed {len(paths)} file(s) from {self.corpus_dir} "
+                        f"({'full rebuild' if rebuild else 'incremental'}, {len(self.segments)} segment(s)).")
+            self.open()
+            return len(paths)
+
+    def open(self):
+        """Maps the postings of every segment; the term tables are the only part read into memory."""
+        with self._lock:
+            for segment in list(self._open_segments):
+                if segment not in self.segments:
+                    self._close_segment(segment)
+            live = [doc for doc in self.docs if doc["live"]]
+            self.live_count = len(live)
+            self.avg_length = (sum(doc["length"] for doc in live) / len(live)) if live else 0.0
+            for segment in self.segments:
+                if segment in self._open_segments:
+                    continue
+                terms_path, postings_path = self._segment_paths(segment)
+                with open(terms_path, encoding="utf-8") as f:
+                    terms = json.load(f)
+                file = open(postings_path, "rb")
+                mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+                self._open_segments[segment] = (terms, file, mapped, memoryview(mapped).cast("I"))
+
+    def _close_segment(self, segment):
+        entry = self._open_segments.pop(segment, None)
+        if entry is not None:
+            terms, file, mapped, postings = entry
+            postings.release()
+            mapped.close()
+            file.close()
+
+    def close(self):
+        with self._lock:
+            for segment in list(self._open_segments):
+                self._close_segment(segment)
+
+    def search(self, query, limit=10):
+        """Returns up to `limit` (document, score) pairs for the live documents matching the query, best first."""
+        with self._lock:
+            query_terms = set(tokenize(query))
+            if not query_terms or not self.live_count:
+                return []
+            matches = {}
+            for term in query_terms:
+                entries = []
+                for terms, file, mapped, postings in self._open_segments.values():
+                    if term not in terms:
+                        continue
+                    offset, count = terms[term]
+                    for i in range(2 * offset, 2 * (offset + count), 2):
+                        doc_id = postings[i]
+                        if self.docs[doc_id]["live"]:
+                            entries.append((doc_id, postings[i + 1]))
+                if entries:
+                    matches[term] = entries
+            scores = Counter()
+            for term, entries in matches.items():
+                freq = len(entries)
+                idf = math.log(1 + (self.live_count - freq + 0.5) / (freq + 0.5))
+                for doc_id, tf in entries:
+                    length = self.docs[doc_id]["length"]
+                    norm = self.k1 * (1 - self.b + self.b * length / self.avg_length) if self.avg_length else self.k1
+                    scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+            best = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], -item[0]))
+            return [(self.docs[doc_id], score) for doc_id, score in best]
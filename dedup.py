@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+import re
+import random
+import hashlib
+import threading
+from urllib.parse import urlparse
+
+WORD_PATTERN = re.compile(r"\w+")
+MERSENNE_PRIME = (1 << 61) - 1
+
+def normalize_text(text):
+    return " ".join(WORD_PATTERN.findall(text.lower()))
+
+def content_hash(text):
+    return hashlib.sha1(normalize_text(text).encode("utf-8")).hexdigest()
+
+def shingles(text, size=3):
+    words = WORD_PATTERN.findall(text.lower())
+    if len(words) <= size:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+class MinHasher:
+    """MinHash signatures over word shingles; the share of equal slots estimates Jaccard similarity."""
+    def __init__(self, num_perm=64, seed=1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self.params = [(rng.randrange(1, MERSENNE_PRIME), rng.randrange(0, MERSENNE_PRIME)) for _ in range(num_perm)]
+
+    def signature(self, text):
+        hashes = [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "big")
+                  for s in shingles(text)]
+        return tuple(min((a * h + b) % MERSENNE_PRIME for h in hashes) for a, b in self.params)
+
+def estimated_similarity(sig_a, sig_b):
+    return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / len(sig_a)
+
+class DedupIndex:
+    """
+    Remembers URLs and texts seen during a research session.
+    1) URLs are matched exactly after normalization.
+    2) Texts are matched exactly by normalized content hash, and approximately by MinHash:
+       two texts are near-duplicates when their estimated shingle Jaccard similarity is at least `threshold`.
+    3) Signatures are split into bands (LSH), so a lookup only compares against texts sharing a band.
+    """
+    def __init__(self, threshold=0.7, num_perm=64, bands=16, min_words=8):
+        self.threshold = threshold
+        self.min_words = min_words
+        self.hasher = MinHasher(num_perm=num_perm)
+        self.rows = num_perm // bands
+        self._lock = threading.Lock()
+        self._urls = set()
+        self._hashes = set()
+        self._buckets = [{} for _ in range(bands)]
+
+    def _band_keys(self, signature):
+        return [signature[i * self.rows:(i + 1) * self.rows] for i in range(len(self._buckets))]
+
+    def _near_duplicate(self, signature):
+        checked = set()
+        for bucket, key in zip(self._buckets, self._band_keys(signature)):
+            for index, candidate in bucket.get(key, ()):
+                if index in checked:
+                    continue
+                checked.add(index)
+                if estimated_similarity(signature, candidate) >= self.threshold:
+                    return True
+        return False
+
+    def add_url(self, url):
+        """Records the URL; returns False if it was already seen."""
+        parsed = urlparse(url.strip())
+        key = parsed._replace(scheme=parsed.scheme.lower(), netloc=parsed.netloc.lower(),
+                              path=parsed.path.rstrip("/"), fragment="").geturl()
+        with self._lock:
+            if key in self._urls:
+                return False
+            self._urls.add(key)
+            return True
+
+    def add_text(self, text):
+        """Records the text; returns False if it duplicates or nearly duplicates a text already seen."""
+        digest = content_hash(text)
+        # Signatures of very short texts are too noisy to compare, so those only match exactly.
+        signature = self.hasher.signature(text) if len(WORD_PATTERN.findall(text)) >= self.min_words else None
+        with self._lock:
+            if digest in self._hashes:
+                return False
+            if signature is not None and self._near_duplicate(signature):
+                return False
+            self._hashes.add(digest)
+            if signature is not None:
+                entry = (len(self._hashes), signature)
+                for bucket, key in zip(self._buckets, self._band_keys(signature)):
+                    bucket.setdefault(key, []).append(entry)
+            return True
+
+    def filter_new(self, texts):
+        """Returns the texts not seen before, in order, recording each of them."""
+        return [text for text in texts if self.add_text(text)]
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+import os
+import time
+import sqlite3
+import threading
+
+class DiskCache:
+    """
+    Small key/value store in a local SQLite file.
+    1) Entries expire after a per-entry TTL (in seconds, None for no expiry).
+    2) When the stored values exceed `max_bytes`, the least recently used entries are evicted.
+    3) Hit/miss counters are kept per key namespace (the part of the key before the first ':').
+    """
+    def __init__(self, path, max_bytes=200 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+            "expires_at REAL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+        self._conn.commit()
+        self._stats = {}
+
+    def _count(self, key, outcome):
+        namespace = key.split(":", 1)[0]
+        counts = self._stats.setdefault(namespace, {"hits": 0, "misses": 0})
+        counts[outcome] += 1
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None or (row[1] is not None and row[1] < now):
+                if row is not None:
+                    self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                    self._conn.commit()
+                self._count(key, "misses")
+                return None
+            self._conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self._count(key, "hits")
+            return row[0]
+
+    def set(self, key, value, ttl=None):
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        expires_at = now + ttl if ttl is not None else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, expires_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, expires_at, now),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now):
+        self._conn.execute("DELETE FROM entries WHERE expires_at IS NOT NULL AND expires_at < ?", (now,))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Evict down to 90% of the cap so a full cache does not evict on every write.
+        target = total - int(self.max_bytes * 0.9)
+        freed = 0
+        stale_keys = []
+        for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY last_access ASC"):
+            stale_keys.append((key,))
+            freed += size
+            if freed >= target:
+                break
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", stale_keys)
+
+    def stats(self):
+        with self._lock:
+            entries, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+            return {"entries": entries, "bytes": total,
+                    "namespaces": {name: dict(counts) for name, counts in self._stats.items()}}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
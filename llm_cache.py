@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+import os
+import json
+import atexit
+import hashlib
+import threading
+from disk_cache import DiskCache
+
+_llm_cache = None
+_llm_cache_lock = threading.Lock()
+
+def get_llm_cache():
+    """Returns the process-wide on-disk cache of LLM responses, creating it on first use."""
+    global _llm_cache
+    with _llm_cache_lock:
+        if _llm_cache is None:
+            _llm_cache = DiskCache(
+                os.getenv("LLM_CACHE_PATH", "./cache/llm_cache.sqlite3"),
+                max_bytes=int(os.getenv("LLM_CACHE_MAX_MB", "100")) * 1024 * 1024,
+            )
+            atexit.register(_llm_cache.close)
+        return _llm_cache
+
+class CachedLLM:
+    """
+    Wraps a LangChain LLM and memoizes its responses on disk.
+    1) The cache key covers the backend type, model name, temperature and the full prompt or message list.
+    2) Empty responses and failed calls are never cached.
+    3) Any other attribute is forwarded to the wrapped LLM.
+    """
+    def __init__(self, llm, cache, llm_type, model_name, temperature, ttl=None):
+        self.llm = llm
+        self.cache = cache
+        self.llm_type = llm_type
+        self.model_name = model_name
+        self.temperature = temperature
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def cache_key(self, prompt):
+        payload = json.dumps(
+            {"type": self.llm_type, "model": self.model_name, "temperature": self.temperature, "prompt": prompt},
+            sort_keys=True,
+        )
+        return "llm:" + hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def invoke(self, prompt, **kwargs):
+        key = self.cache_key(prompt)
+        response = self.cache.get(key)
+        with self._lock:
+            if response is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if response is not None:
+            return response
+        response = self.llm.invoke(prompt, **kwargs)
+        if response and response.strip():
+            self.cache.set(key, response, ttl=self.ttl)
+        return response
+
+    __call__ = invoke
+
+    def stream(self, prompt, **kwargs):
+        """Yields a cached response in one piece, or streams from the wrapped LLM and caches the completed response."""
+        key = self.cache_key(prompt)
+        response = self.cache.get(key)
+        with self._lock:
+            if response is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if response is not None:
+            yield response
+            return
+        chunks = []
+        for chunk in self.llm.stream(prompt, **kwargs):
+            chunks.append(chunk)
+            yield chunk
+        response = "".join(chunks)
+        if response.strip():
+            self.cache.set(key, response, ttl=self.ttl)
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / total if total else 0.0}
@@ -1,34 +1,154 @@
 #!/usr/bin/env python3
 import os
+import re
+import uuid
 import logging
+import threading
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from langchain_community.llms import OpenAI
 from langchain_community.llms import Ollama
 import gradio as gr
-from search_tool import WebSearchScraper
+from search_backends import get_search_backend
+from llm_cache import CachedLLM, get_llm_cache
+from ranking import SnippetRanker
+from dedup import DedupIndex
+from pipeline import ResearchPipeline
+from notebook_store import NotebookStore, find_related_notes, read_session_query
+from tokens import estimate_tokens, pack_by_budget, truncate_to_tokens
+from tracing import tracer, propagate, TracedLLM
 
 load_dotenv()
 
 MAINQUERY_COUNT = int(os.getenv("MAINQUERY_COUNT", "4"))
 SUBQUERY_COUNT = int(os.getenv("SUBQUERY_COUNT", "2"))
 NOTEBOOK_LINE_THRESHOLD = int(os.getenv("NOTEBOOK_LINE_THRESHOLD", "25"))
+SEARCH_CONCURRENCY = int(os.getenv("SEARCH_CONCURRENCY", "4"))
+PIPELINE_FETCH_WINDOW = int(os.getenv("PIPELINE_FETCH_WINDOW", "2"))
+PIPELINE_PENDING_BATCHES = int(os.getenv("PIPELINE_PENDING_BATCHES", "0"))
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE", "true").lower() in ["true", "1", "yes"]
+LLM_CACHE_NONZERO_TEMPERATURE = os.getenv("LLM_CACHE_NONZERO_TEMPERATURE", "false").lower() in ["true", "1", "yes"]
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "604800"))
+SNIPPET_RANKER = os.getenv("SNIPPET_RANKER", "bm25").lower()
+SNIPPET_SCORE_FLOOR = float(os.getenv("SNIPPET_SCORE_FLOOR", "0.05"))
+LAIRA_CONCURRENCY = int(os.getenv("LAIRA_CONCURRENCY", "2"))
+LAIRA_QUEUE_SIZE = int(os.getenv("LAIRA_QUEUE_SIZE", "20"))
+NOTEBOOK_DIR = os.getenv("NOTEBOOK_DIR", "./notebook")
+NOTEBOOK_FLUSH_EVERY = int(os.getenv("NOTEBOOK_FLUSH_EVERY", "16"))
+NOTEBOOK_WARM_START = os.getenv("NOTEBOOK_WARM_START", "true").lower() in ["true", "1", "yes"]
+NOTEBOOK_WARM_SIMILARITY = float(os.getenv("NOTEBOOK_WARM_SIMILARITY", "0.3"))
+NOTEBOOK_WARM_SESSIONS = int(os.getenv("NOTEBOOK_WARM_SESSIONS", "3"))
+LAIRA_TRACE = os.getenv("LAIRA_TRACE", "false").lower() in ["true", "1", "yes"]
+LAIRA_TRACE_FORMAT = os.getenv("LAIRA_TRACE_FORMAT", "jsonl").lower()
+LAIRA_TRACE_DIR = os.getenv("LAIRA_TRACE_DIR", "./traces")
+REPORT_CONTEXT_TOKENS = int(os.getenv("REPORT_CONTEXT_TOKENS", "4096"))
+REPORT_OUTPUT_TOKENS = int(os.getenv("REPORT_OUTPUT_TOKENS", "1024"))
+CONVERSATION_WINDOW = int(os.getenv("CONVERSATION_WINDOW", "6"))
+RELEVANCE_BATCH_SIZE = int(os.getenv("RELEVANCE_BATCH_SIZE", "15"))
+RELEVANCE_BATCH_CHARS = int(os.getenv("RELEVANCE_BATCH_CHARS", "6000"))
+CHUNK_TARGET_TOKENS = int(os.getenv("CHUNK_TARGET_TOKENS", "150"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "20"))
+
+BATCH_VERDICT_PATTERN = re.compile(r"^\s*\[(\d+)\]\s*[:\-]?\s*(.*)$")
+# "NO" as small models tend to phrase it: "No.", "None", "Not relevant", "No - not relevant", "None of it is useful".
+# "No" or "None" followed by punctuation is only negative when relevance wording follows, so an extract that
+# starts with the word ("No, the Fed raised rates in 2022.") is kept.
+NEGATIVE_VERDICT_PATTERN = re.compile(
+    r"^\W*(?:(?:no|none|n/a|irrelevant)\W*$|(?:no|none)(?:\s*[,:;\-\u2013\u2014]|\s+of\b).*\b(?:relevant|related|useful|information)\b"
+    r"|(?:no|not|nothing)\s+(?:relevant|related|useful)\b)",
+    re.IGNORECASE)
+# A reply that is a single sentence ending in "... is not relevant" or "... (contains) no relevant information",
+# optionally followed by "to the query".
+NOT_RELEVANT_PATTERN = re.compile(
+    r"^[^.!?]*\b(?:(?:is|are)\s+not|isn't|aren't|(?:is|are|contains?|has|have)\s+no|(?:does|do)\s+not\s+contain(?:\s+any)?"
+    r"|doesn't\s+contain(?:\s+any)?)\s+(?:relevant|related|useful)(?:\s+(?:information|content|details|data))?"
+    r"(?:\s+(?:to|for|about)\s+(?:the\s+)?(?:user'?s?\s+)?(?:query|question|topic|request))?\W*$",
+    re.IGNORECASE)
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
+tracer.enabled = LAIRA_TRACE
+
+_backend_slots = {}
+_backend_slots_lock = threading.Lock()
+
+def get_researcher_llm_type(researcher_id):
+    return os.getenv(f"RESEARCHER_{researcher_id}_LLM_TYPE", "openai").lower()
+
+def get_backend_max_in_flight(llm_type):
+    default = "2" if llm_type == "ollama" else "8"
+    return max(1, int(os.getenv(f"{llm_type.upper()}_MAX_IN_FLIGHT", default)))
+
+def get_backend_slots(llm_type):
+    """Returns the process-wide semaphore bounding concurrent LLM calls to one backend type."""
+    with _backend_slots_lock:
+        if llm_type not in _backend_slots:
+            _backend_slots[llm_type] = threading.BoundedSemaphore(get_backend_max_in_flight(llm_type))
+        return _backend_slots[llm_type]
+
+def get_pending_batch_limit(llm_type):
+    """Assessment batches a research round may have started but not yet consumed (twice the in-flight limit by default)."""
+    return PIPELINE_PENDING_BATCHES or 2 * get_backend_max_in_flight(llm_type)
 
 def initialize_researcher_llm(researcher_id):
     llm_name = os.getenv(f"RESEARCHER_{researcher_id}_LLM")
-    llm_type = os.getenv(f"RESEARCHER_{researcher_id}_LLM_TYPE", "openai").lower()
+    llm_type = get_researcher_llm_type(researcher_id)
     temperature = float(os.getenv(f"RESEARCHER_{researcher_id}_LLM_TEMPERATURE", "0"))
     if llm_type == "ollama":
         logger.info(f"Initializing Researcher {researcher_id} LLM with Ollama model: {llm_name}")
-        return Ollama(model=llm_name)
+        llm = Ollama(model=llm_name, temperature=temperature)
     else:
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise ValueError("OPENAI_API_KEY is missing in .env file")
         logger.info(f"Initializing Researcher {researcher_id} LLM with OpenAI model: {llm_name}")
-        return OpenAI(api_key=api_key, model_name=llm_name, temperature=temperature)
+        llm = OpenAI(api_key=api_key, model_name=llm_name, temperature=temperature)
+    llm = TracedLLM(llm, llm_type, llm_name)
+    if not LLM_CACHE_ENABLED:
+        return llm
+    if temperature != 0 and not LLM_CACHE_NONZERO_TEMPERATURE:
+        logger.info(f"Researcher {researcher_id} LLM uses temperature {temperature}; response caching disabled.")
+        return llm
+    return CachedLLM(llm, get_llm_cache(), llm_type, llm_name, temperature, ttl=LLM_CACHE_TTL)
+
+def initialize_snippet_ranker():
+    embeddings = None
+    if SNIPPET_RANKER == "embedding":
+        from langchain_community.embeddings import OllamaEmbeddings
+        model = os.getenv("SNIPPET_EMBEDDING_MODEL", "nomic-embed-text")
+        logger.info(f"Initializing snippet ranker with Ollama embedding model: {model}")
+        embeddings = OllamaEmbeddings(model=model)
+    return SnippetRanker(method=SNIPPET_RANKER, floor=SNIPPET_SCORE_FLOOR, embeddings=embeddings)
+
+def get_llm_cache_stats(researchers):
+    """Collects hit/miss counters of the researchers whose LLM responses are cached."""
+    return {researcher.id: researcher.llm.stats() for researcher in researchers if isinstance(researcher.llm, CachedLLM)}
+
+def cache_stats_since(before, after):
+    """Hit/miss counters in `after` minus those in the `before` snapshot, per researcher or namespace."""
+    deltas = {}
+    for key, counts in after.items():
+        hits = counts["hits"] - before.get(key, {}).get("hits", 0)
+        misses = counts["misses"] - before.get(key, {}).get("misses", 0)
+        deltas[key] = {"hits": hits, "misses": misses, "hit_rate": hits / (hits + misses) if hits + misses else 0.0}
+    return deltas
+
+def normalize_verdict(response):
+    """Returns 'NO' for a relevance reply that says the snippet is not relevant, otherwise the reply stripped."""
+    response = response.strip()
+    if not response or NEGATIVE_VERDICT_PATTERN.match(response) or NOT_RELEVANT_PATTERN.search(response):
+        return "NO"
+    return response
+
+def get_scrape_cache_stats(researchers):
+    """Hit/miss counters of the scrape cache per key namespace (search_html, page_text, ...), if the backend has one."""
+    stats = {}
+    for researcher in researchers:
+        scraper = getattr(researcher, "scraper", None)
+        if hasattr(scraper, "cache_stats"):
+            stats.update(scraper.cache_stats().get("namespaces", {}))
+    return stats
 
 def get_researcher_instructions(researcher_id):
     return os.getenv(f"RESEARCHER_{researcher_id}_INSTRUCTIONS", "")
@@ -36,23 +156,40 @@ def get_researcher_instructions(researcher_id):
 def get_researcher_use_tools(researcher_id):
     return os.getenv(f"RESEARCHER_{researcher_id}_USE_TOOLS", "false").lower() in ["true", "1", "yes"]
 
+class ResearchSession:
+    """
+    Per-query state, kept apart from the researchers so one research team can serve several queries at once.
+    1) Holds each researcher's conversation history.
+    2) Holds the notebook and the session's NotebookStore; an existing session ID reloads both from disk.
+    """
+    def __init__(self, session_id=None, notebook_dir=None):
+        self.id = session_id or uuid.uuid4().hex[:12]
+        self.conversations = {}
+        self.notebook_dir = notebook_dir or NOTEBOOK_DIR
+        self.store = NotebookStore(self.notebook_dir, self.id, flush_every=NOTEBOOK_FLUSH_EVERY)
+        self.notebook = [note["text"] for note in self.store.notes]
+    def conversation(self, researcher_id):
+        return self.conversations.setdefault(researcher_id, [])
+    def recent_conversation(self, researcher_id):
+        """The last CONVERSATION_WINDOW messages, which is all that is sent back to the LLM."""
+        return self.conversation(researcher_id)[-CONVERSATION_WINDOW:] if CONVERSATION_WINDOW > 0 else []
+
 class SearchResearcher:
     """
     Researcher1 (Search):
-    1) Maintains a conversation history with the LLM.
+    1) Continues the session's conversation history with the LLM.
     2) Generates main subqueries as CSV.
     3) Refines them.
-    4) Executes web searches.
+    4) Executes searches through the search backend selected in .env (web or local corpus).
     5) Passes snippets to ReportResearcher for relevance checks.
     """
-    def __init__(self, researcher_id):
+    def __init__(self, researcher_id, scraper=None):
         self.id = researcher_id
         self.instructions = get_researcher_instructions(researcher_id)
         self.use_tools = get_researcher_use_tools(researcher_id)
-        self.scraper = WebSearchScraper()
+        self.scraper = scraper or get_search_backend()
         self.llm = initialize_researcher_llm(researcher_id)
-        self.conversation = []
-    def generate_main_subqueries(self, original_query):
+    def generate_main_subqueries(self, original_query, session):
         logger.info(f"Researcher {self.id} (Search): Generating {MAINQUERY_COUNT} search terms for: {original_query}")
         system_prompt = (
             "System: You are the 'Search Researcher'. Your job is to produce short, direct subqueries "
@@ -65,7 +202,7 @@ class SearchResearcher:
         )
         messages = [{"role": "system", "content": system_prompt},
                     {"role": "user", "content": user_prompt}]
-        messages += self.conversation
+        messages += session.recent_conversation(self.id)
         max_attempts = 3
         response = ""
         for attempt in range(max_attempts):
@@ -73,7 +210,7 @@ class SearchResearcher:
                 response = self.llm.invoke(messages) if hasattr(self.llm, "invoke") else self.llm(messages)
                 subqueries = [s.strip() for s in response.split(",") if s.strip()]
                 if len(subqueries) == MAINQUERY_COUNT:
-                    self.conversation.append({"role": "assistant", "content": response})
+                    session.conversation(self.id).append({"role": "assistant", "content": response})
                     logger.info(f"Researcher {self.id} (Search): Main subqueries generated successfully.")
                     return response.strip()
                 else:
@@ -84,7 +221,7 @@ class SearchResearcher:
                 logger.error(f"Researcher {self.id} (Search): Error generating subqueries: {e}")
                 return ""
         return response.strip()
-    def refine_to_subqueries(self, raw_subqueries, original_query, subquery_count):
+    def refine_to_subqueries(self, raw_subqueries, original_query, subquery_count, session):
         logger.info(f"Researcher {self.id} (Search): Refining subqueries to the best {subquery_count}.")
         system_prompt = (
             "System: You are 'CSV Output Researcher'. Refine the subqueries to keep them relevant. "
@@ -99,7 +236,7 @@ class SearchResearcher:
         )
         messages = [{"role": "system", "content": system_prompt},
                     {"role": "user", "content": user_prompt}]
-        messages += self.conversation
+        messages += session.recent_conversation(self.id)
         max_attempts = 3
         response = ""
         for attempt in range(max_attempts):
@@ -107,7 +244,7 @@ class SearchResearcher:
                 response = self.llm.invoke(messages) if hasattr(self.llm, "invoke") else self.llm(messages)
                 subqueries = [s.strip() for s in response.split(",") if s.strip()]
                 if len(subqueries) == subquery_count:
-                    self.conversation.append({"role": "assistant", "content": response})
+                    session.conversation(self.id).append({"role": "assistant", "content": response})
                     logger.info(f"Researcher {self.id} (Search): Refined subqueries generated successfully.")
                     return response.strip()
                 else:
@@ -118,16 +255,17 @@ class SearchResearcher:
                 logger.error(f"Researcher {self.id} (Search): Error refining subqueries: {e}")
                 return ""
         return response.strip()
-    def perform_search(self, subquery):
+    def search_result_links(self, subquery, limit=None):
+        """Returns up to `limit` search results (link, title, snippet) for the subquery without fetching the pages."""
         clean_subquery = subquery.strip().strip('\'"')
         logger.info(f"Researcher {self.id} (Search): Performing web search for subquery: {clean_subquery}")
         try:
-            raw_text = self.scraper.webSearch_text(clean_subquery)
+            results = self.scraper.select_results(clean_subquery, limit=limit)
             logger.info(f"Researcher {self.id} (Search): Search completed for subquery: {clean_subquery}")
         except Exception as e:
             logger.error(f"Researcher {self.id} (Search): Error during web search: {e}")
-            raw_text = f"[Search failed for {clean_subquery}: {e}]"
-        return raw_text
+            results = []
+        return results
 
 class ReportResearcher:
     """
@@ -140,7 +278,7 @@ class ReportResearcher:
         self.instructions = get_researcher_instructions(researcher_id)
         self.use_tools = get_researcher_use_tools(researcher_id)
         self.llm = initialize_researcher_llm(researcher_id)
-        self.conversation = []
+        self.llm_type = get_researcher_llm_type(researcher_id)
     def assess_snippet_relevance_and_summarize(self, user_query, snippet):
         logger.info(f"Researcher {self.id} (Report): Assessing snippet relevance.")
         prompt = (
@@ -153,16 +291,99 @@ class ReportResearcher:
             f"{snippet}\n\n"
             "If relevant, output only the portions of the snippet that are useful. If not relevant, output only 'no'.\n\n"
         )
-        logger.info(f"Researcher {self.id} (Report): Relevance check prompt:\n{prompt}")
+        logger.debug(f"Researcher {self.id} (Report): Relevance check prompt:\n{prompt}")
         try:
             response = self.llm.invoke(prompt) if hasattr(self.llm, "invoke") else self.llm(prompt)
-            logger.info(f"Researcher {self.id} (Report): Response:\n{response}")
-            return response.strip()
+            logger.debug(f"Researcher {self.id} (Report): Response:\n{response}")
+            return normalize_verdict(response)
         except Exception as e:
             logger.error(f"Researcher {self.id} (Report): Error assessing snippet: {e}")
             return "NO"
-    def generate_final_report(self, user_query, researcher_notebook):
-        logger.info(f"Researcher {self.id} (Report): Generating final report.")
+    def batch_snippets(self, snippets):
+        """Groups snippets into batches bounded by RELEVANCE_BATCH_SIZE and RELEVANCE_BATCH_CHARS."""
+        batches = []
+        batch = []
+        batch_chars = 0
+        for snippet in snippets:
+            if batch and (len(batch) >= RELEVANCE_BATCH_SIZE or batch_chars + len(snippet) > RELEVANCE_BATCH_CHARS):
+                batches.append(batch)
+                batch = []
+                batch_chars = 0
+            batch.append(snippet)
+            batch_chars += len(snippet)
+        if batch:
+            batches.append(batch)
+        return batches
+    def parse_batch_verdicts(self, response, batch_size):
+        """Maps snippet IDs (1-based) to the extracted text or 'NO'. Lines without an ID continue the previous entry."""
+        verdicts = {}
+        current_id = None
+        for line in response.splitlines():
+            match = BATCH_VERDICT_PATTERN.match(line)
+            if match:
+                snippet_id = int(match.group(1))
+                if 1 <= snippet_id <= batch_size and snippet_id not in verdicts:
+                    current_id = snippet_id
+                    verdicts[current_id] = match.group(2).strip()
+                else:
+                    current_id = None
+            elif current_id is not None and line.strip():
+                verdicts[current_id] += " " + line.strip()
+        return {snippet_id: normalize_verdict(verdict) for snippet_id, verdict in verdicts.items()}
+    def assess_snippets_batch(self, user_query, snippets):
+        """
+        Checks several snippets in a single LLM call.
+        Returns one result per snippet, in order: the relevant text, or 'NO'.
+        Snippets the reply does not cover are re-checked one at a time.
+        """
+        if len(snippets) == 1:
+            return [self.assess_snippet_relevance_and_summarize(user_query, snippets[0])]
+        logger.info(f"Researcher {self.id} (Report): Assessing relevance of {len(snippets)} snippets in one batch.")
+        numbered = "\n".join(f"[{i}] {' '.join(snippet.split())}" for i, snippet in enumerate(snippets, start=1))
+        prompt = (
+            f"{self.instructions}\n"
+            "We are collecting web-search information to answer the User Query.\n"
+            "Below are numbered snippets. For EACH snippet, output exactly the text from that snippet that is directly relevant to the User Query. Do not modify or add any commentary.\n"
+            "Answer with one line per snippet, starting with its number in brackets:\n"
+            "[<number>] <relevant text from the snippet>\n"
+            "or, if the snippet has no relevant information:\n"
+            "[<number>] NO\n\n"
+            f"User Query: {user_query}\n\n"
+            "Snippets:\n"
+            f"{numbered}\n\n"
+            f"Answer for all {len(snippets)} snippets, in order, and output nothing else.\n\n"
+        )
+        try:
+            response = self.llm.invoke(prompt) if hasattr(self.llm, "invoke") else self.llm(prompt)
+            verdicts = self.parse_batch_verdicts(response, len(snippets))
+        except Exception as e:
+            logger.error(f"Researcher {self.id} (Report): Error assessing snippet batch: {e}")
+            verdicts = {}
+        missing = len(snippets) - len(verdicts)
+        if missing:
+            logger.info(f"Researcher {self.id} (Report): {missing} snippet(s) not covered by the batch reply; checking individually.")
+        return [verdicts[i] if i in verdicts else self.assess_snippet_relevance_and_summarize(user_query, snippet)
+                for i, snippet in enumerate(snippets, start=1)]
+    def assess_batch_limited(self, user_query, batch):
+        """Assesses one batch once the backend has a free in-flight slot."""
+        with get_backend_slots(self.llm_type):
+            return self.assess_snippets_batch(user_query, batch)
+    def iter_batch_assessments(self, user_query, batches):
+        """
+        Assesses batches concurrently, bounded by the backend's in-flight limit, and yields
+        each batch's results in the original order. Closing the generator cancels batches not yet started.
+        """
+        if not batches:
+            return
+        executor = ThreadPoolExecutor(max_workers=min(len(batches), get_backend_max_in_flight(self.llm_type)))
+        assess = propagate(self.assess_batch_limited)
+        futures = [executor.submit(assess, user_query, batch) for batch in batches]
+        try:
+            for future in futures:
+                yield future.result()
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+    def _final_report_messages(self, user_query, researcher_notebook, session):
         joined_info = "\n".join(researcher_notebook)
         prompt = (
             f"{self.instructions}\n"
@@ -173,24 +394,93 @@ class ReportResearcher:
         )
         messages = [{"role": "system", "content": "System: Provide a final comprehensive answer using the provided texts."},
                     {"role": "user", "content": prompt}]
-        messages += self.conversation
+        messages += session.recent_conversation(self.id)
+        return messages
+    def summarize_notes(self, user_query, notes):
+        prompt = (
+            f"{self.instructions}\n"
+            "You are condensing research notes so they fit into the final report prompt.\n"
+            "Rewrite the notes below as a compact list of facts. Keep every fact, figure, name and date that is relevant to the User Query, drop repetition, and do not add anything that is not in the notes.\n\n"
+            f"User Query: {user_query}\n\n"
+            "Notes:\n"
+            + "\n".join(notes)
+            + "\n\nOutput only the condensed notes."
+        )
+        try:
+            with get_backend_slots(self.llm_type):
+                response = self.llm.invoke(prompt) if hasattr(self.llm, "invoke") else self.llm(prompt)
+            if response and response.strip():
+                return response.strip()
+        except Exception as e:
+            logger.error(f"Researcher {self.id} (Report): Error condensing notes: {e}")
+        return "\n".join(notes)
+    def fit_notes_to_context(self, user_query, researcher_notebook, session):
+        """
+        Returns notes that fit the final report prompt within REPORT_CONTEXT_TOKENS.
+        Notebooks that are too large are split into chunks that are condensed in parallel (map),
+        and the condensed chunks are condensed again until they fit (reduce).
+        """
+        overhead = sum(estimate_tokens(m["content"]) for m in self._final_report_messages(user_query, [], session))
+        budget = REPORT_CONTEXT_TOKENS - REPORT_OUTPUT_TOKENS - overhead
+        if budget <= 0:
+            logger.warning(f"Researcher {self.id} (Report): The report prompt leaves no room for notes within "
+                           f"REPORT_CONTEXT_TOKENS={REPORT_CONTEXT_TOKENS}; writing the report without them.")
+            return []
+        # A single note over the budget could not fit even a chunk of its own.
+        notes = [truncate_to_tokens(note, budget) for note in researcher_notebook]
+        total = estimate_tokens("\n".join(notes))
+        while total > budget:
+            groups = pack_by_budget(notes, budget)
+            logger.info(f"Researcher {self.id} (Report): Notebook is ~{total} tokens, budget {budget}; "
+                        f"condensing {len(groups)} chunks.")
+            with ThreadPoolExecutor(max_workers=min(len(groups), get_backend_max_in_flight(self.llm_type))) as executor:
+                condense = propagate(lambda group: self.summarize_notes(user_query, group))
+                condensed = list(executor.map(condense, groups))
+            condensed_total = estimate_tokens("\n".join(condensed))
+            if condensed_total >= total:
+                logger.info(f"Researcher {self.id} (Report): Condensing made no progress; truncating notes to the budget.")
+                return [truncate_to_tokens(text, budget) for text in pack_by_budget(condensed, budget)[0]]
+            notes, total = condensed, condensed_total
+        return notes
+    def generate_final_report(self, user_query, researcher_notebook, session):
+        """Returns the final report from a single LLM call; raises when no report could be produced."""
+        logger.info(f"Researcher {self.id} (Report): Generating final report.")
+        notes = self.fit_notes_to_context(user_query, researcher_notebook, session)
+        messages = self._final_report_messages(user_query, notes, session)
         max_attempts = 3
-        response = ""
         for attempt in range(max_attempts):
-            try:
-                response = self.llm.invoke(messages) if hasattr(self.llm, "invoke") else self.llm(messages)
-                if response and len(response.strip()) > 0:
-                    self.conversation.append({"role": "assistant", "content": response})
-                    logger.info(f"Researcher {self.id} (Report): Final report generated successfully.")
-                    return response.strip()
-                else:
-                    correction = "Error correction: Provide a comprehensive final answer using only the provided texts."
-                    logger.info(f"Researcher {self.id} (Report): Inadequate final report, requesting correction.")
-                    messages.append({"role": "user", "content": correction})
-            except Exception as e:
-                logger.error(f"Researcher {self.id} (Report): Error generating final report: {e}")
-                return f"Error generating final report: {e}"
-        return response.strip()
+            response = self.llm.invoke(messages) if hasattr(self.llm, "invoke") else self.llm(messages)
+            if response and len(response.strip()) > 0:
+                session.conversation(self.id).append({"role": "assistant", "content": response})
+                logger.info(f"Researcher {self.id} (Report): Final report generated successfully.")
+                return response.strip()
+            correction = "Error correction: Provide a comprehensive final answer using only the provided texts."
+            logger.info(f"Researcher {self.id} (Report): Inadequate final report, requesting correction.")
+            messages.append({"role": "user", "content": correction})
+        raise RuntimeError(f"no report after {max_attempts} attempts")
+    def stream_final_report(self, user_query, researcher_notebook, session):
+        """
+        Yields the final report in chunks as the LLM produces them.
+        LLMs without streaming support, and streams that end empty, fall back to a single call.
+        Raises when the report could not be produced in full, including after some chunks were yielded.
+        """
+        if not hasattr(self.llm, "stream"):
+            yield self.generate_final_report(user_query, researcher_notebook, session)
+            return
+        logger.info(f"Researcher {self.id} (Report): Streaming final report.")
+        notes = self.fit_notes_to_context(user_query, researcher_notebook, session)
+        messages = self._final_report_messages(user_query, notes, session)
+        chunks = []
+        for chunk in self.llm.stream(messages):
+            chunks.append(chunk)
+            yield chunk
+        response = "".join(chunks)
+        if response.strip():
+            session.conversation(self.id).append({"role": "assistant", "content": response})
+            logger.info(f"Researcher {self.id} (Report): Final report generated successfully.")
+        else:
+            logger.info(f"Researcher {self.id} (Report): Empty streamed report, retrying without streaming.")
+            yield self.generate_final_report(user_query, researcher_notebook, session)
 
 class LeadResearcher:
     """
@@ -217,6 +507,7 @@ class LeadResearcher:
             self.search_researcher = tools[0]
         if self.report_researcher is None and tools:
             self.report_researcher = tools[0]
+        self.snippet_ranker = initialize_snippet_ranker()
         self.direct_answer = ""
     def should_research(self, query):
         prompt = (
@@ -238,57 +529,178 @@ class LeadResearcher:
                 logger.error(f"LeadResearcher {self.id}: Error in should_research: {e}")
                 break
         return True
-    def process_query(self, user_query):
-        logger.info(f"LeadResearcher {self.id}: process_query started with query: {user_query}")
+    def process_query(self, user_query, session=None):
+        """Runs the research to completion and returns the final report."""
+        chunks = [event["text"] for event in self.iter_process_query(user_query, session) if event["type"] == "report"]
+        return "".join(chunks).strip()
+    def iter_process_query(self, user_query, session=None):
+        """
+        Runs the research as a generator of progress events (dicts with a "type" key):
+        'status', 'subqueries', 'pages' and 'note' while researching, then 'report' events
+        carrying the final report's text chunk by chunk.
+        """
+        session = session or ResearchSession()
+        logger.info(f"LeadResearcher {self.id}: process_query started with query: {user_query} (session {session.id})")
         if not self.use_tools:
             logger.info(f"LeadResearcher {self.id}: Tools disabled. Returning direct answer.")
-            return f"No research performed. Query was: {user_query}"
-        if not self.should_research(user_query):
+            yield {"type": "report", "text": f"No research performed. Query was: {user_query}"}
+            return
+        store = session.store
+        if store.report is not None:
+            logger.info(f"LeadResearcher {self.id}: Session {session.id} already finished; returning its report.")
+            yield {"type": "report", "text": store.report}
+            return
+        yield {"type": "status", "message": "Deciding whether research is needed."}
+        with tracer.span("research.should_research"):
+            research_needed = self.should_research(user_query)
+        if not research_needed:
             logger.info(f"LeadResearcher {self.id}: No research needed. Returning direct answer.")
-            return self.direct_answer
-        notebook = []
-        notebook_dir = "./notebook"
-        os.makedirs(notebook_dir, exist_ok=True)
-        notebook_file_path = os.path.join(notebook_dir, "notebook.txt")
-        with open(notebook_file_path, "w", encoding="utf-8") as f:
-            f.write("")
+            yield {"type": "report", "text": self.direct_answer}
+            return
+        try:
+            yield from self._research(user_query, session)
+        finally:
+            store.close()
+    def _assess_into_notebook(self, user_query, snippets, session, notebook_index, sources, round_num):
+        """
+        Assesses the snippets not assessed earlier in the session and adds the relevant text to the notebook,
+        yielding a 'note' event for each addition. Stops once the notebook reaches NOTEBOOK_LINE_THRESHOLD.
+        """
+        notebook = session.notebook
+        store = session.store
+        pending = [snippet for snippet in snippets if not store.is_assessed(snippet)]
+        if len(pending) < len(snippets):
+            logger.info(f"LeadResearcher {self.id}: Skipping {len(snippets) - len(pending)} snippets assessed before.")
+        batches = self.report_researcher.batch_snippets(pending)
+        logger.info(f"LeadResearcher {self.id}: Assessing {len(batches)} snippet batches.")
+        yield {"type": "status", "message": f"Assessing {len(pending)} snippets."}
+        with closing(self.report_researcher.iter_batch_assessments(user_query, batches)) as assessments:
+            for batch, summaries in zip(batches, assessments):
+                yield from self._add_to_notebook(batch, summaries, session, notebook_index, sources, round_num)
+                if len(notebook) >= NOTEBOOK_LINE_THRESHOLD:
+                    break
+    def _add_to_notebook(self, batch, summaries, session, notebook_index, sources, round_num):
+        """
+        Adds the relevant, not yet noted text of an assessed batch to the notebook, yielding a 'note' event for each.
+        Stops at NOTEBOOK_LINE_THRESHOLD; the snippets handled so far are recorded as assessed.
+        """
+        notebook = session.notebook
+        store = session.store
+        assessed = []
+        try:
+            for snippet, summary in zip(batch, summaries):
+                assessed.append(snippet)
+                if summary.upper().strip() == "NO":
+                    continue
+                if notebook_index.add_text(summary):
+                    notebook.append(summary)
+                    logger.info(f"LeadResearcher {self.id}: New relevant snippet added to notebook.\nNote: {summary}")
+                    url, subquery = sources.get(snippet, (None, None))
+                    with tracer.span("notebook.write"):
+                        store.record_note(summary, url, subquery, round_num)
+                    yield {"type": "note", "text": summary, "count": len(notebook)}
+                else:
+                    logger.info(f"LeadResearcher {self.id}: Duplicate snippet detected; skipping addition.")
+                if len(notebook) >= NOTEBOOK_LINE_THRESHOLD:
+                    break
+        finally:
+            store.record_assessed(assessed)
+            store.flush()
+    def _research(self, user_query, session):
+        notebook = session.notebook
+        store = session.store
+        # Seen URLs, page contents and snippets for the whole query, and a separate index of notebook entries.
+        seen = DedupIndex()
+        notebook_index = DedupIndex()
+        for note in notebook:
+            notebook_index.add_text(note)
+        # Source URL and subquery of each snippet, recorded with the notes made from it.
+        sources = {}
+        if store.query is None:
+            store.record_query(user_query)
+            store.flush()
+            if NOTEBOOK_WARM_START:
+                warm_notes = find_related_notes(session.notebook_dir, user_query, exclude=session.id,
+                                                min_similarity=NOTEBOOK_WARM_SIMILARITY, max_sessions=NOTEBOOK_WARM_SESSIONS)
+                for note in warm_notes:
+                    sources.setdefault(note["text"], (note.get("url"), note.get("subquery")))
+                warm_lines = seen.filter_new([note["text"] for note in warm_notes])
+                if warm_lines:
+                    # Notes of related sessions are re-assessed for this query before anything is searched.
+                    yield {"type": "status", "message": f"Reusing {len(warm_lines)} notes from related past sessions."}
+                    yield from self._assess_into_notebook(user_query, warm_lines, session, notebook_index, sources, 0)
+        else:
+            logger.info(f"LeadResearcher {self.id}: Resuming session {session.id} with {len(notebook)} notes.")
+            yield {"type": "status", "message": f"Resuming session {session.id} with {len(notebook)} notes."}
         round_num = 0
         max_rounds = 3
-        while round_num < max_rounds:
+        while round_num < max_rounds and len(notebook) < NOTEBOOK_LINE_THRESHOLD:
             logger.info(f"LeadResearcher {self.id}: Starting research round {round_num+1}.")
-            main_subqueries = self.search_researcher.generate_main_subqueries(user_query)
-            refined_subqueries = self.search_researcher.refine_to_subqueries(main_subqueries, user_query, SUBQUERY_COUNT)
-            best_subqueries = [s.strip() for s in refined_subqueries.split(",") if s.strip()]
+            yield {"type": "status", "message": f"Starting research round {round_num+1}."}
+            best_subqueries = store.subqueries.get(round_num + 1)
+            if best_subqueries is None:
+                with tracer.span("research.subqueries", round=round_num + 1):
+                    main_subqueries = self.search_researcher.generate_main_subqueries(user_query, session)
+                    refined_subqueries = self.search_researcher.refine_to_subqueries(main_subqueries, user_query, SUBQUERY_COUNT, session)
+                best_subqueries = [s.strip() for s in refined_subqueries.split(",") if s.strip()]
+                store.record_subqueries(round_num + 1, best_subqueries)
+            logger.info(f"LeadResearcher {self.id}: Searching with subqueries: {best_subqueries}")
+            yield {"type": "subqueries", "round": round_num + 1, "subqueries": best_subqueries}
+            # Results and pages recorded by an interrupted run are reused; only what is missing is searched or fetched.
+            recorded = {}
             for subquery in best_subqueries:
-                logger.info(f"LeadResearcher {self.id}: Searching with subquery: {subquery}")
-                search_results_text = self.search_researcher.perform_search(subquery)
-                lines = [line for line in search_results_text.split("\n") if line.strip()]
-                logger.info(f"LeadResearcher {self.id}: Found {len(lines)} snippet lines for subquery: {subquery}")
-                for idx, snippet in enumerate(lines):
-                    logger.info(f"LeadResearcher {self.id}: Processing snippet {idx+1}/{len(lines)}.")
-                    summary = self.report_researcher.assess_snippet_relevance_and_summarize(user_query, snippet)
-                    if summary.upper().strip() != "NO":
-                        if summary not in notebook:
-                            notebook.append(summary)
-                            logger.info(f"LeadResearcher {self.id}: New relevant snippet added to notebook.\nNote: {summary}")
-                            with open(notebook_file_path, "a", encoding="utf-8") as f:
-                                f.write(summary + "\n")
-                        else:
-                            logger.info(f"LeadResearcher {self.id}: Duplicate snippet detected; skipping addition.")
-                        if len(notebook) >= NOTEBOOK_LINE_THRESHOLD:
-                            logger.info(f"LeadResearcher {self.id}: Notebook threshold reached. Generating final report.")
-                            final_report = self.report_researcher.generate_final_report(user_query, notebook)
-                            return final_report
+                results = store.recorded_results(round_num + 1, subquery)
+                if results is not None:
+                    recorded[subquery] = results
+            pipeline = ResearchPipeline(self.search_researcher, self.report_researcher, self.snippet_ranker, seen, sources,
+                                        window=PIPELINE_FETCH_WINDOW, max_pending=get_pending_batch_limit(self.report_researcher.llm_type),
+                                        search_workers=SEARCH_CONCURRENCY, skip=store.is_assessed,
+                                        chunk_tokens=CHUNK_TARGET_TOKENS, chunk_overlap=CHUNK_OVERLAP_TOKENS)
+            with closing(pipeline.run(user_query, best_subqueries, recorded)) as stages:
+                for stage in stages:
+                    if stage["type"] == "page":
+                        subquery, page = stage["subquery"], stage["page"]
+                        if (round_num + 1, subquery) not in store.results:
+                            store.record_results(round_num + 1, subquery, stage["results"])
+                        if not store.has_page(round_num + 1, subquery, page["link"]):
+                            store.record_page(round_num + 1, subquery, page["link"], page["text"])
+                            store.flush()
+                        continue
+                    if stage["type"] == "pages":
+                        subquery, pages = stage["subquery"], stage["pages"]
+                        logger.info(f"LeadResearcher {self.id}: Queued {stage['snippets']} new snippets for subquery: {subquery}")
+                        yield {"type": "pages", "subquery": subquery, "urls": [page["link"] for page in pages], "snippets": stage["snippets"]}
+                        continue
+                    yield from self._add_to_notebook(stage["batch"], stage["summaries"], session, notebook_index, sources, round_num + 1)
+                    if len(notebook) >= NOTEBOOK_LINE_THRESHOLD:
+                        logger.info(f"LeadResearcher {self.id}: Notebook threshold reached. Cancelling outstanding work.")
+                        break
+            if len(notebook) >= NOTEBOOK_LINE_THRESHOLD:
+                logger.info(f"LeadResearcher {self.id}: Notebook threshold reached. Generating final report.")
+                break
             round_num += 1
             if not notebook:
                 logger.info(f"LeadResearcher {self.id}: No relevant info collected. Instructing agents to retry.")
                 instruction = "Error correction: Previous searches did not yield relevant results. Please generate alternative subqueries and reattempt."
-                self.search_researcher.conversation.append({"role": "user", "content": instruction})
-                self.report_researcher.conversation.append({"role": "user", "content": instruction})
-        final_report = self.report_researcher.generate_final_report(user_query, notebook)
-        return final_report
+                session.conversation(self.search_researcher.id).append({"role": "user", "content": instruction})
+                session.conversation(self.report_researcher.id).append({"role": "user", "content": instruction})
+        yield {"type": "status", "message": f"Writing the final report from {len(notebook)} notes."}
+        report = []
+        try:
+            with tracer.span("research.report", notes=len(notebook)):
+                for chunk in self.report_researcher.stream_final_report(user_query, notebook, session):
+                    report.append(chunk)
+                    yield {"type": "report", "text": chunk}
+        except Exception as e:
+            # A failed or cut-off report is not recorded, so resuming the session writes it again.
+            logger.error(f"LeadResearcher {self.id}: Error generating final report: {e}")
+            prefix = "\n\n" if report else ""
+            yield {"type": "report", "text": f"{prefix}Error generating final report: {e}"}
+            return
+        store.record_report("".join(report))
 
-def initialize_research_team():
+def initialize_research_team(scraper=None):
+    """Builds the researchers configured in .env; `scraper` replaces the search backend of the search researchers."""
     researcher_ids = set()
     for key in os.environ:
         if key.startswith("RESEARCHER_") and key.endswith("_LLM"):
@@ -302,7 +714,7 @@ def initialize_research_team():
         if role == "lead":
             lead_id = rid
         elif role == "search":
-            tools.append(SearchResearcher(rid))
+            tools.append(SearchResearcher(rid, scraper=scraper))
         elif role == "report":
             tools.append(ReportResearcher(rid))
         else:
@@ -311,18 +723,91 @@ def initialize_research_team():
         raise ValueError("No lead researcher (role=lead) found in .env configuration.")
     return LeadResearcher(lead_id, tools)
 
-def laira_interface(query):
+_research_team = None
+_research_team_lock = threading.Lock()
+
+def get_research_team():
+    """Builds the research team (LLM clients, scraper, browser pool) once per process and shares it."""
+    global _research_team
+    with _research_team_lock:
+        if _research_team is None:
+            _research_team = initialize_research_team()
+        return _research_team
+
+def format_progress_event(event):
+    if event["type"] == "subqueries":
+        return f"Round {event['round']}: searching for " + ", ".join(event["subqueries"])
+    if event["type"] == "pages":
+        return f"Fetched {len(event['urls'])} page(s) for '{event['subquery']}' ({event['snippets']} new snippets)"
+    if event["type"] == "note":
+        return f"Note {event['count']}: {event['text']}"
+    return event.get("message", "")
+
+def export_trace(run_id):
+    """Writes the run's spans to LAIRA_TRACE_DIR and logs the per-stage summary table."""
+    os.makedirs(LAIRA_TRACE_DIR, exist_ok=True)
+    if LAIRA_TRACE_FORMAT == "chrome":
+        path = os.path.join(LAIRA_TRACE_DIR, f"{run_id}.trace.json")
+        tracer.export_chrome_trace(path, run_id)
+    else:
+        path = os.path.join(LAIRA_TRACE_DIR, f"{run_id}.jsonl")
+        tracer.export_jsonl(path, run_id)
+    logger.info(f"LAIRA Interface: Trace written to {path}\n{tracer.summary(run_id)}")
+    tracer.clear(run_id)
+
+def open_session(query, session_id=""):
+    """
+    Resumes the session with the given ID when its notebook was recorded for the same query;
+    otherwise starts a new session.
+    """
+    session_id = (session_id or "").strip()
+    if session_id and not re.fullmatch(r"[\w-]+", session_id):
+        logger.warning(f"LAIRA Interface: Ignoring invalid session ID '{session_id}'.")
+        session_id = ""
+    if session_id:
+        recorded_query = read_session_query(os.path.join(NOTEBOOK_DIR, f"{session_id}.jsonl"))
+        if recorded_query is None:
+            logger.info(f"LAIRA Interface: No notebook for session {session_id}; starting it fresh.")
+        elif recorded_query.strip() != query.strip():
+            logger.warning(f"LAIRA Interface: Session {session_id} was recorded for another query; starting a new session.")
+            session_id = ""
+    return ResearchSession(session_id or None)
+
+def laira_interface(query, session_id=""):
+    """Streams progress lines while researching, then the final report as it is written."""
     logger.info(f"LAIRA Interface: Received user query: {query}")
-    lead = initialize_research_team()
-    final_report = lead.process_query(query)
-    logger.info("LAIRA Interface: Final report generated.")
-    return final_report
+    lead = get_research_team()
+    session = open_session(query, session_id)
+    progress = [f"Session ID: {session.id}"]
+    report = ""
+    # The counters cover the whole process, so the query's own hits and misses are the change from here.
+    llm_stats = get_llm_cache_stats([lead] + lead.tools)
+    scrape_stats = get_scrape_cache_stats(lead.tools)
+    for event in tracer.iter_run(lead.iter_process_query(query, session), session.id):
+        if event["type"] == "report":
+            report += event["text"]
+            yield report
+        else:
+            progress.append(format_progress_event(event))
+            yield "\n".join(progress)
+    logger.info(f"LAIRA Interface: Final report generated for session {session.id}.")
+    if tracer.enabled:
+        export_trace(session.id)
+    for researcher_id, stats in cache_stats_since(llm_stats, get_llm_cache_stats([lead] + lead.tools)).items():
+        logger.info(f"LAIRA Interface: Researcher {researcher_id} LLM cache hits {stats['hits']}, "
+                    f"misses {stats['misses']} ({stats['hit_rate']:.0%}) during this query.")
+    for namespace, stats in cache_stats_since(scrape_stats, get_scrape_cache_stats(lead.tools)).items():
+        logger.info(f"LAIRA Interface: Scrape cache {namespace} hits {stats['hits']}, "
+                    f"misses {stats['misses']} ({stats['hit_rate']:.0%}) during this query.")
 
 def main():
     logger.info("Launching LAIRA Gradio interface...")
     interface = gr.Interface(
         fn=laira_interface,
-        inputs=gr.components.Textbox(lines=2, placeholder="Enter your research query here..."),
+        inputs=[
+            gr.components.Textbox(lines=2, placeholder="Enter your research query here..."),
+            gr.components.Textbox(lines=1, label="Session ID (optional)", placeholder="Paste a session ID to resume it"),
+        ],
         outputs="text",
         title="LAIRA - Langchain AI Research Assistants",
         description=(
@@ -331,6 +816,9 @@ def main():
         ),
         theme="default"
     )
+    # Each queued query gets its own ResearchSession, so up to LAIRA_CONCURRENCY can run at once.
+    interface.queue(default_concurrency_limit=LAIRA_CONCURRENCY, max_size=LAIRA_QUEUE_SIZE)
+    get_research_team()
     interface.launch()
 
 if __name__ == "__main__":
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+import os
+import json
+import logging
+import threading
+from dedup import content_hash
+from ranking import tokenize
+
+logger = logging.getLogger(__name__)
+
+class NotebookStore:
+    """
+    Append-only JSON-lines log of one research session, kept at <directory>/<session id>.jsonl.
+    1) Records the query, each round's subqueries, the search results of each subquery and the text of each
+       page once it is processed, the hashes of assessed snippets, every note with its source URL,
+       subquery and round, and the final report.
+    2) Writes are buffered and reach the disk on `flush()`, or once `flush_every` records are waiting.
+    3) An existing log is loaded back on open, so an interrupted session can resume without
+       searching, fetching or assessing again what it already did.
+    """
+    def __init__(self, directory, session_id, flush_every=16):
+        self.path = os.path.join(directory, f"{session_id}.jsonl")
+        self.flush_every = flush_every
+        self._lock = threading.Lock()
+        self._buffer = []
+        self._file = None
+        self._needs_newline = False
+        self.query = None
+        self.subqueries = {}
+        self.results = {}
+        self.page_texts = {}
+        self.assessed = set()
+        self.notes = []
+        self.report = None
+        if os.path.exists(self.path):
+            self._load()
+    def _load(self):
+        with open(self.path, encoding="utf-8") as f:
+            content = f.read()
+        # A crash can leave the last record cut short; it is skipped, and the next write starts on a new line.
+        self._needs_newline = bool(content) and not content.endswith("\n")
+        for line in content.splitlines():
+            try:
+                self._apply(json.loads(line))
+            except (json.JSONDecodeError, KeyError, TypeError):
+                logger.warning(f"NotebookStore: Skipping unreadable record in {self.path}.")
+    def _apply(self, record):
+        kind = record["kind"]
+        if kind == "query":
+            self.query = record["query"]
+        elif kind == "subqueries":
+            self.subqueries[record["round"]] = record["subqueries"]
+        elif kind == "results":
+            self.results[(record["round"], record["subquery"])] = record["results"]
+        elif kind == "page":
+            self.page_texts.setdefault((record["round"], record["subquery"]), {})[record["link"]] = record["text"]
+        elif kind == "assessed":
+            self.assessed.update(record["hashes"])
+        elif kind == "note":
+            self.notes.append(record)
+        elif kind == "report":
+            self.report = record["text"]
+    def _append(self, record):
+        with self._lock:
+            self._apply(record)
+            self._buffer.append(json.dumps(record, ensure_ascii=False))
+            if len(self._buffer) >= self.flush_every:
+                self._flush_locked()
+    def record_query(self, query):
+        self._append({"kind": "query", "query": query})
+    def record_subqueries(self, round_num, subqueries):
+        self._append({"kind": "subqueries", "round": round_num, "subqueries": subqueries})
+    def record_results(self, round_num, subquery, results):
+        self._append({"kind": "results", "round": round_num, "subquery": subquery, "results": results})
+    def record_page(self, round_num, subquery, link, text):
+        self._append({"kind": "page", "round": round_num, "subquery": subquery, "link": link, "text": text})
+    def has_page(self, round_num, subquery, link):
+        return link in self.page_texts.get((round_num, subquery), {})
+    def recorded_results(self, round_num, subquery):
+        """The subquery's recorded search results, with the text of the pages processed so far, or None."""
+        results = self.results.get((round_num, subquery))
+        if results is None:
+            return None
+        texts = self.page_texts.get((round_num, subquery), {})
+        return [{**result, "text": texts[result["link"]]} if result["link"] in texts else result for result in results]
+    def record_assessed(self, snippets):
+        if snippets:
+            self._append({"kind": "assessed", "hashes": [content_hash(snippet) for snippet in snippets]})
+    def record_note(self, text, url, subquery, round_num):
+        self._append({"kind": "note", "text": text, "url": url, "subquery": subquery, "round": round_num})
+    def record_report(self, text):
+        self._append({"kind": "report", "text": text})
+    def is_assessed(self, snippet):
+        return content_hash(snippet) in self.assessed
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+    def _flush_locked(self):
+        if not self._buffer:
+            return
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8")
+        if self._needs_newline:
+            self._file.write("\n")
+            self._needs_newline = False
+        self._file.write("\n".join(self._buffer) + "\n")
+        self._file.flush()
+        self._buffer = []
+    def close(self):
+        with self._lock:
+            self._flush_locked()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+def read_session_query(path):
+    """Returns the query a session log was started for, reading only its first record."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            record = json.loads(f.readline())
+        return record["query"] if record.get("kind") == "query" else None
+    except (OSError, ValueError, KeyError, AttributeError):
+        return None
+
+def find_related_notes(directory, query, exclude=None, min_similarity=0.3, max_sessions=3):
+    """
+    Collects the notes of past sessions whose query shares at least `min_similarity` of its terms
+    (Jaccard similarity) with `query`, from up to `max_sessions` sessions, most similar first.
+    """
+    if not os.path.isdir(directory):
+        return []
+    query_terms = set(tokenize(query))
+    if not query_terms:
+        return []
+    candidates = []
+    for name in os.listdir(directory):
+        session_id, ext = os.path.splitext(name)
+        if ext != ".jsonl" or session_id == exclude:
+            continue
+        past_query = read_session_query(os.path.join(directory, name))
+        past_terms = set(tokenize(past_query or ""))
+        if not past_terms:
+            continue
+        similarity = len(query_terms & past_terms) / len(query_terms | past_terms)
+        if similarity >= min_similarity:
+            candidates.append((similarity, session_id))
+    notes = []
+    for similarity, session_id in sorted(candidates, reverse=True)[:max_sessions]:
+        logger.info(f"NotebookStore: Reusing notes of session {session_id} (query similarity {similarity:.2f}).")
+        notes += NotebookStore(directory, session_id).notes
+    return notes
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+import time
+import queue
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from tracing import tracer, propagate
+from chunking import chunk_text
+
+logger = logging.getLogger(__name__)
+
+class ResearchPipeline:
+    """
+    Runs one research round as overlapping stages instead of one phase after another.
+    1) Search: all subqueries are searched at once, `search_workers` at a time.
+    2) Fetch: result pages are downloaded and their text extracted on the scraper's page workers, for at most
+       `window` subqueries ahead of the one being consumed, which bounds the pages held in memory.
+    3) Snippets: each page is chunked (see chunking.chunk_text), de-duplicated and ranked as soon as it and
+       every page before it are in, and its chunks are packed into assessment batches.
+    4) Assess: batches are assessed concurrently, with at most `max_pending` waiting to be consumed;
+       while that many are waiting, no further pages are processed.
+    Pages and batches are handled in subquery and result order, so the batches sent to the LLM depend only
+    on the pages, not on the order downloads finish in.
+    """
+    def __init__(self, search_researcher, report_researcher, ranker, seen, sources, window=2, max_pending=4,
+                 search_workers=4, skip=None, chunk_tokens=150, chunk_overlap=20):
+        self.search_researcher = search_researcher
+        self.report_researcher = report_researcher
+        self.scraper = search_researcher.scraper
+        self.ranker = ranker
+        self.seen = seen
+        self.sources = sources
+        self.window = max(1, window)
+        self.max_pending = max(1, max_pending)
+        self.search_workers = max(1, search_workers)
+        self.skip = skip
+        self.chunk_tokens = chunk_tokens
+        self.chunk_overlap = chunk_overlap
+        # BM25 statistics of every snippet ranked this round, so each page is scored against the round so far.
+        self.collection = ranker.collection()
+        self._events = queue.Queue()
+
+    def _search(self, index, subquery):
+        """Search stage: finds the subquery's candidate results. Seen URLs are only dropped when fetching starts."""
+        results = []
+        try:
+            with tracer.span("research.search", subquery=subquery) as attrs:
+                # Extra candidates stand in for results already fetched for an earlier subquery.
+                results = self.search_researcher.search_result_links(subquery, limit=self.scraper.max_results * 4)
+                attrs["results"] = len(results)
+        except Exception as e:
+            logger.error(f"ResearchPipeline: Error searching for '{subquery}': {e}")
+        finally:
+            self._events.put(("searched", index, results))
+
+    def _start_fetch(self, candidates, recorded):
+        """
+        Keeps the first `max_results` candidates whose URL is new and starts fetching them. Called in subquery
+        order, so a URL found for several subqueries always goes to the first of them, whichever search ends first.
+        """
+        if recorded:
+            # Results recorded by an interrupted run were selected then; only their unprocessed pages are fetched.
+            results = [{key: value for key, value in result.items() if key != "text"} for result in candidates]
+            texts = [result.get("text") for result in candidates]
+            for result in results:
+                self.seen.add_url(result["link"])
+        else:
+            results = []
+            for result in candidates:
+                if len(results) >= self.scraper.max_results:
+                    break
+                if self.seen.add_url(result["link"]):
+                    results.append(result)
+            texts = [None] * len(results)
+        futures = []
+        try:
+            for result, text in zip(results, texts):
+                if text is not None:
+                    future = Future()
+                    future.set_result(text)
+                else:
+                    future = self.scraper.submit_page(result)
+                    future.add_done_callback(lambda _: self._events.put(("page",)))
+                futures.append(future)
+        except Exception as e:
+            logger.error(f"ResearchPipeline: Error fetching {result['link']}: {e}")
+            results = results[:len(futures)]
+        return results, futures, time.monotonic()
+
+    def _page_text(self, result, future):
+        if not future.done():
+            future.cancel()
+            logger.info(f"ResearchPipeline: Timed out fetching {result['link']}.")
+            return ""
+        if future.cancelled():
+            return ""
+        if future.exception() is not None:
+            logger.error(f"ResearchPipeline: Error fetching {result['link']}: {future.exception()}")
+            return ""
+        return future.result()
+
+    def _page_snippets(self, page, subquery, queries):
+        """Snippet stage: the page's new chunks, ranked, minus those assessed earlier in the session."""
+        with tracer.span("research.chunk", text_chars=len(page["text"])) as attrs:
+            if not page["text"].strip() or not self.seen.add_text(page["text"]):
+                return []
+            chunks = chunk_text(page["text"], target_tokens=self.chunk_tokens, overlap_tokens=self.chunk_overlap)
+            attrs["chunks"] = len(chunks)
+        with tracer.span("research.dedup", snippets=len(chunks)):
+            for chunk in chunks:
+                self.sources.setdefault(chunk, (page["link"], subquery))
+            new_lines = self.seen.filter_new(chunks)
+        with tracer.span("research.rank", snippets=len(new_lines)):
+            ranked = self.ranker.rank(new_lines, queries, self.collection)
+        if self.skip is not None:
+            ranked = [line for line in ranked if not self.skip(line)]
+        return ranked
+
+    def run(self, user_query, subqueries, recorded=None):
+        """
+        Yields {'type': 'page', 'subquery', 'results', 'page'} as each page is processed,
+        {'type': 'pages', 'subquery', 'pages', 'snippets'} once all of a subquery's pages are processed,
+        and {'type': 'assessed', 'batch', 'summaries'} for each assessed batch, in order.
+        `recorded` maps subqueries to results selected earlier; those with a 'text' are not fetched again.
+        Closing the generator stops the stages and cancels the work not yet started.
+        """
+        recorded = recorded or {}
+        queries = [user_query] + list(subqueries)
+        searches = ThreadPoolExecutor(max_workers=min(len(subqueries), self.search_workers) or 1)
+        assessments = ThreadPoolExecutor(max_workers=self.max_pending)
+        assess = propagate(self.report_researcher.assess_batch_limited)
+        searched = {}
+        for index, subquery in enumerate(subqueries):
+            if subquery in recorded:
+                searched[index] = recorded[subquery]
+            else:
+                searches.submit(propagate(self._search), index, subquery)
+        fetching = {}
+        next_fetch = 0
+
+        def start_fetches():
+            """Fetch stage: starts subqueries in order, at most `window` ahead of the one being consumed."""
+            nonlocal next_fetch
+            started = next_fetch
+            while next_fetch < min(len(subqueries), head + self.window) and next_fetch in searched:
+                fetching[next_fetch] = self._start_fetch(searched.pop(next_fetch), subqueries[next_fetch] in recorded)
+                next_fetch += 1
+            return next_fetch > started
+
+        head, head_page = 0, 0
+        pages, open_lines, snippet_count = [], [], 0
+        ready, submitted = [], []
+        try:
+            while True:
+                progressed = start_fetches()
+                # Snippet stage: process pages in order while the assessment stage has room for more batches.
+                while head < len(subqueries) and not ready and head in fetching:
+                    results, futures, started = fetching[head]
+                    if head_page < len(results):
+                        future = futures[head_page]
+                        if not future.done() and time.monotonic() < started + self.scraper.page_timeout:
+                            break
+                        page = {**results[head_page], "text": self._page_text(results[head_page], future)}
+                        pages.append(page)
+                        snippets = self._page_snippets(page, subqueries[head], queries)
+                        snippet_count += len(snippets)
+                        open_lines += snippets
+                        # All but the last batch are full and can be assessed now; the last waits for more snippets.
+                        batches = self.report_researcher.batch_snippets(open_lines)
+                        ready += batches[:-1]
+                        open_lines = batches[-1] if batches else []
+                        head_page += 1
+                        progressed = True
+                        yield {"type": "page", "subquery": subqueries[head], "results": results, "page": page}
+                        continue
+                    if open_lines:
+                        ready.append(open_lines)
+                    done = {"type": "pages", "subquery": subqueries[head], "pages": pages, "snippets": snippet_count}
+                    del fetching[head]
+                    head, head_page = head + 1, 0
+                    pages, open_lines, snippet_count = [], [], 0
+                    # The next subquery's pages start loading before the caller handles this one's.
+                    start_fetches()
+                    progressed = True
+                    yield done
+                # Assess stage: start ready batches while fewer than max_pending are waiting to be consumed.
+                while ready and len(submitted) < self.max_pending:
+                    batch = ready.pop(0)
+                    future = assessments.submit(assess, user_query, batch)
+                    future.add_done_callback(lambda _: self._events.put(("assessed",)))
+                    submitted.append((batch, future))
+                    progressed = True
+                while submitted and submitted[0][1].done():
+                    batch, future = submitted.pop(0)
+                    try:
+                        summaries = future.result()
+                    except Exception as e:
+                        logger.error(f"ResearchPipeline: Error assessing a batch of {len(batch)} snippets: {e}")
+                        summaries = ["NO"] * len(batch)
+                    yield {"type": "assessed", "batch": batch, "summaries": summaries}
+                    progressed = True
+                if head >= len(subqueries) and not ready and not submitted:
+                    return
+                if progressed:
+                    continue
+                timeout = None
+                if head in fetching and not ready and head_page < len(fetching[head][0]):
+                    timeout = max(0.0, fetching[head][2] + self.scraper.page_timeout - time.monotonic())
+                try:
+                    event = self._events.get(timeout=timeout)
+                except queue.Empty:
+                    continue
+                while True:
+                    if event[0] == "searched":
+                        _, index, results = event
+                        searched[index] = results
+                    try:
+                        event = self._events.get_nowait()
+                    except queue.Empty:
+                        break
+        finally:
+            for results, futures, started in fetching.values():
+                for future in futures:
+                    future.cancel()
+            searches.shutdown(wait=False, cancel_futures=True)
+            assessments.shutdown(wait=False, cancel_futures=True)
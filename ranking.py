@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+import re
+import math
+import logging
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have", "in", "is", "it",
+    "its", "of", "on", "or", "that", "the", "this", "to", "was", "were", "what", "when", "where",
+    "which", "who", "why", "how", "will", "with",
+}
+
+def tokenize(text):
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+class BM25:
+    """
+    Okapi BM25 over an in-memory collection of tokenized documents.
+    The collection statistics (document frequencies and lengths) can grow with `add` as documents arrive.
+    """
+    def __init__(self, documents=(), k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.doc_freq = Counter()
+        self.doc_count = 0
+        self.total_length = 0
+        self.add(documents)
+
+    def add(self, documents):
+        for doc in documents:
+            self.doc_freq.update(set(doc))
+            self.doc_count += 1
+            self.total_length += len(doc)
+
+    def idf(self, term):
+        freq = self.doc_freq.get(term, 0)
+        return math.log(1 + (self.doc_count - freq + 0.5) / (freq + 0.5))
+
+    def scores(self, documents, query_tokens):
+        query_terms = set(query_tokens)
+        avg_length = self.total_length / self.doc_count if self.doc_count else 0.0
+        results = []
+        for doc in documents:
+            counts = Counter(doc)
+            norm = self.k1 * (1 - self.b + self.b * len(doc) / avg_length) if avg_length else self.k1
+            score = 0.0
+            for term in query_terms:
+                freq = counts.get(term)
+                if freq:
+                    score += self.idf(term) * freq * (self.k1 + 1) / (freq + norm)
+            results.append(score)
+        return results
+
+    def max_score(self, query_tokens):
+        """
+        Upper bound of a document's score for the query: every term, with a very high frequency.
+        Terms no document contains are left out, as their large IDF would dwarf every real match.
+        """
+        return sum(self.idf(term) * (self.k1 + 1) for term in set(query_tokens) if term in self.doc_freq)
+
+class SnippetRanker:
+    """
+    Orders snippets by how well they match a set of queries before they are sent to the LLM.
+    1) 'bm25' scores each snippet with BM25, divided by the highest score possible for the query, so scores
+       run from 0 (no query term) towards 1; 'embedding' uses cosine similarity from a local embedding model;
+       'none' keeps the page order.
+    2) A snippet's score is its best score over all queries. Scores are absolute, so they can be compared
+       between pages.
+    3) Snippets scoring below `floor` are dropped.
+    4) A `collection()` passed to `rank` keeps BM25 statistics across calls, so snippets ranked a page at a
+       time are scored against everything seen so far rather than against their own page alone.
+    """
+    def __init__(self, method="bm25", floor=0.0, embeddings=None):
+        self.method = method
+        self.floor = floor
+        self.embeddings = embeddings
+
+    def collection(self):
+        return BM25()
+
+    def _bm25_scores(self, snippets, queries, collection=None):
+        index = collection if collection is not None else BM25()
+        documents = [tokenize(snippet) for snippet in snippets]
+        index.add(documents)
+        per_query = []
+        for query in queries:
+            query_tokens = tokenize(query)
+            best = index.max_score(query_tokens)
+            per_query.append([score / best for score in index.scores(documents, query_tokens)] if best > 0
+                             else [0.0] * len(documents))
+        return [max(scores) for scores in zip(*per_query)]
+
+    def _embedding_scores(self, snippets, queries):
+        snippet_vectors = self.embeddings.embed_documents(snippets)
+        query_vectors = [self.embeddings.embed_query(query) for query in queries]
+        def cosine(u, v):
+            norm = math.sqrt(sum(x * x for x in u)) * math.sqrt(sum(x * x for x in v))
+            return sum(x * y for x, y in zip(u, v)) / norm if norm else 0.0
+        return [max(cosine(vector, query_vector) for query_vector in query_vectors) for vector in snippet_vectors]
+
+    def score(self, snippets, queries, collection=None):
+        queries = [query for query in queries if query.strip()]
+        if not snippets or not queries:
+            return [1.0] * len(snippets)
+        if self.method == "embedding" and self.embeddings is not None:
+            try:
+                return self._embedding_scores(snippets, queries)
+            except Exception as e:
+                logger.error(f"SnippetRanker: Embedding scoring failed, using BM25 instead: {e}")
+        return self._bm25_scores(snippets, queries, collection)
+
+    def rank(self, snippets, queries, collection=None):
+        """Returns the snippets at or above the floor, best first; ties keep their original order."""
+        if self.method == "none":
+            return list(snippets)
+        scores = self.score(snippets, queries, collection)
+        order = sorted(range(len(snippets)), key=lambda i: -scores[i])
+        return [snippets[i] for i in order if scores[i] >= self.floor]
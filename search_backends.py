@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+import os
+import logging
+import threading
+from pathlib import Path
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+from corpus_index import CorpusIndex, read_document
+from search_tool import SearchBackend, WebSearchScraper
+from tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+class LocalCorpusBackend(SearchBackend):
+    """
+    Searches a local directory of text, Markdown and HTML files through a CorpusIndex.
+    Results link to the files as file:// URLs; documents are read from disk when their text is requested.
+    """
+    def __init__(self, corpus_dir, index_dir, max_results=3):
+        if not os.path.isdir(corpus_dir):
+            raise ValueError(f"LOCAL_CORPUS_DIR '{corpus_dir}' is not a directory.")
+        self.max_results = max_results
+        self.index = CorpusIndex(corpus_dir, index_dir)
+        self.index.update()
+
+    def select_results(self, query, limit=None):
+        with tracer.span("search.local", query=query) as attrs:
+            selected = [{"link": Path(doc["path"]).as_uri(), "title": doc["title"], "snippet": doc["snippet"] or "No snippet"}
+                        for doc, score in self.index.search(query, limit=limit or self.max_results)]
+            attrs["results"] = len(selected)
+            return selected
+
+    def fetch_page_text(self, link):
+        path = os.path.abspath(url2pathname(urlparse(link).path))
+        if os.path.commonpath([path, self.index.corpus_dir]) != self.index.corpus_dir:
+            raise ValueError(f"{link} is outside the local corpus.")
+        with tracer.span("page.local", path=path):
+            return read_document(path)[1]
+
+_search_backend = None
+_search_backend_lock = threading.Lock()
+
+def get_search_backend():
+    """
+    Returns the process-wide search backend selected by SEARCH_BACKEND: 'web' (DuckDuckGo, the default)
+    or 'local' (the files under LOCAL_CORPUS_DIR, indexed in LOCAL_INDEX_DIR).
+    """
+    global _search_backend
+    with _search_backend_lock:
+        if _search_backend is None:
+            name = os.getenv("SEARCH_BACKEND", "web").lower()
+            if name == "local":
+                corpus_dir = os.getenv("LOCAL_CORPUS_DIR", "./corpus")
+                logger.info(f"Initializing local corpus search backend over {corpus_dir}")
+                _search_backend = LocalCorpusBackend(corpus_dir, os.getenv("LOCAL_INDEX_DIR", "./cache/local_index"),
+                                                     max_results=int(os.getenv("LOCAL_MAX_RESULTS", "3")))
+            elif name == "web":
+                _search_backend = WebSearchScraper()
+            else:
+                raise ValueError(f"Unknown SEARCH_BACKEND '{name}'; use 'web' or 'local'.")
+        return _search_backend
@@ -1,12 +1,455 @@
 #!/usr/bin/env python3
-import time
+import os
 import re
+import time
+import queue
+import atexit
+import logging
+import threading
+from abc import ABC, abstractmethod
+from collections import defaultdict, deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from urllib.parse import urlparse, parse_qs, quote_plus
+import requests
+from requests.adapters import HTTPAdapter
 from selenium import webdriver
+from selenium.common.exceptions import WebDriverException, TimeoutException
 from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.keys import Keys
-from bs4 import BeautifulSoup
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+import lxml.html
+from lxml import etree
+from disk_cache import DiskCache
+from tracing import tracer, propagate
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/115.0 Safari/537.36"
+)
+
+META_CHARSET_PATTERN = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?([\w.:-]+)""", re.IGNORECASE)
+
+def _env_flag(name, default):
+    return os.getenv(name, default).lower() in ["true", "1", "yes"]
 
-class WebSearchScraper:
+class HttpFetcher:
+    """
+    Plain HTTP client used before falling back to a browser.
+    Connections are pooled and kept alive across requests to the same host.
+    """
+    def __init__(self, timeout=10, pool_size=10):
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=1)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({
+            "User-Agent": USER_AGENT,
+            "Accept": "text/html,application/xhtml+xml;q=0.9,*/*;q=0.8",
+            "Accept-Language": "en-US,en;q=0.9",
+        })
+
+    def get(self, url, params=None):
+        """Returns the response body for HTML pages, or None for any other content type."""
+        response = self.session.get(url, params=params, timeout=self.timeout)
+        response.raise_for_status()
+        content_type = response.headers.get("Content-Type", "text/html").lower()
+        if "html" not in content_type:
+            return None
+        if "charset" not in content_type:
+            # requests assumes ISO-8859-1 for text/* without a charset; the page's <meta charset> or a guess is better.
+            declared = META_CHARSET_PATTERN.search(response.content[:4096])
+            response.encoding = declared.group(1).decode("ascii") if declared else response.apparent_encoding
+        return response.text
+
+class _ResourcesSettled:
+    """Wait condition that holds once no new network requests appeared between two polls."""
+    def __init__(self):
+        self.last_count = -1
+
+    def __call__(self, driver):
+        count = driver.execute_script("return performance.getEntriesByType('resource').length")
+        settled = count == self.last_count
+        self.last_count = count
+        return settled
+
+class ChromeDriverPool:
+    """
+    Keeps a bounded set of Chrome sessions alive and lends them out for page loads.
+    1) Launches up to `size` drivers, optionally all at once on warm-up.
+    2) Health-checks a driver before handing it out; dead sessions are replaced.
+    3) Recycles a driver after `max_pages` page loads or when a load crashes it.
+    """
+    def __init__(self, options, size=2, max_pages=50, warmup=False, page_load_timeout=20):
+        self.options = options
+        self.page_load_timeout = page_load_timeout
+        self.size = max(1, size)
+        self.max_pages = max(1, max_pages)
+        self._idle = deque()
+        self._lock = threading.Lock()
+        # Signalled whenever a driver is returned or a slot is freed, so waiting borrowers can retry.
+        self._available = threading.Condition(self._lock)
+        self._created = 0
+        self._page_counts = {}
+        self._closed = False
+        if warmup:
+            self.warm_up()
+
+    def _launch(self):
+        with tracer.span("browser.launch"):
+            driver = webdriver.Chrome(options=self.options)
+            driver.set_page_load_timeout(self.page_load_timeout)
+        self._page_counts[id(driver)] = 0
+        return driver
+
+    def _reserve_slot(self):
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                return True
+        return False
+
+    def _free_slot(self):
+        with self._available:
+            self._created -= 1
+            self._available.notify()
+
+    def _put_idle(self, driver):
+        with self._available:
+            self._idle.append(driver)
+            self._available.notify()
+
+    def _discard(self, driver):
+        self._page_counts.pop(id(driver), None)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+        self._free_slot()
+
+    def _is_healthy(self, driver):
+        try:
+            # Any round trip to the browser fails fast once the session has died.
+            driver.current_url
+            return True
+        except Exception:
+            return False
+
+    def stop_loading(self, driver):
+        """Stops the page load in progress; returns False when the session no longer responds."""
+        try:
+            driver.execute_script("window.stop();")
+            return True
+        except WebDriverException:
+            return False
+
+    def warm_up(self):
+        while self._reserve_slot():
+            try:
+                self._put_idle(self._launch())
+            except Exception as e:
+                self._free_slot()
+                logger.error(f"ChromeDriverPool: Failed to launch driver during warm-up: {e}")
+                break
+        logger.info(f"ChromeDriverPool: {len(self._idle)} driver(s) warmed up.")
+
+    def acquire(self, timeout=None):
+        """Lends an idle driver, or launches one while under `size`; otherwise waits (raises queue.Empty on timeout)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._available:
+                while not self._idle and self._created >= self.size:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise queue.Empty
+                    self._available.wait(remaining)
+                driver = self._idle.popleft() if self._idle else None
+                if driver is None:
+                    self._created += 1
+            if driver is None:
+                try:
+                    return self._launch()
+                except Exception:
+                    self._free_slot()
+                    raise
+            if self._is_healthy(driver):
+                return driver
+            logger.info("ChromeDriverPool: Discarding unresponsive driver.")
+            self._discard(driver)
+
+    def release(self, driver, broken=False):
+        if self._closed:
+            self._discard(driver)
+            return
+        self._page_counts[id(driver)] = self._page_counts.get(id(driver), 0) + 1
+        if broken or self._page_counts[id(driver)] >= self.max_pages:
+            self._discard(driver)
+            return
+        try:
+            # Keep a single tab per session so the next caller starts clean.
+            handles = driver.window_handles
+            for handle in handles[1:]:
+                driver.switch_to.window(handle)
+                driver.close()
+            driver.switch_to.window(handles[0])
+        except Exception:
+            self._discard(driver)
+            return
+        self._put_idle(driver)
+
+    @contextmanager
+    def driver(self):
+        driver = self.acquire()
+        broken = False
+        try:
+            yield driver
+        except TimeoutException:
+            # A slow page does not mean a broken session; stopping the load makes it reusable.
+            broken = not self.stop_loading(driver)
+            raise
+        except WebDriverException:
+            broken = True
+            raise
+        finally:
+            self.release(driver, broken=broken)
+
+    def close(self):
+        self._closed = True
+        with self._lock:
+            drivers = list(self._idle)
+            self._idle.clear()
+        for driver in drivers:
+            self._discard(driver)
+
+_shared_pool = None
+_shared_pool_lock = threading.Lock()
+
+def get_driver_pool(options):
+    """Returns the process-wide driver pool, creating it on first use."""
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            _shared_pool = ChromeDriverPool(
+                options,
+                size=int(os.getenv("SCRAPER_POOL_SIZE", "2")),
+                max_pages=int(os.getenv("SCRAPER_DRIVER_MAX_PAGES", "50")),
+                warmup=_env_flag("SCRAPER_POOL_WARMUP", "true"),
+                page_load_timeout=float(os.getenv("SCRAPER_PAGE_TIMEOUT", "20")),
+            )
+            atexit.register(_shared_pool.close)
+        return _shared_pool
+
+_page_executor = None
+_host_slots = defaultdict(lambda: threading.BoundedSemaphore(int(os.getenv("SCRAPER_PER_HOST_LIMIT", "2"))))
+_host_slots_lock = threading.Lock()
+
+def get_page_executor():
+    """Returns the process-wide worker pool used to fetch result pages."""
+    global _page_executor
+    with _shared_pool_lock:
+        if _page_executor is None:
+            _page_executor = ThreadPoolExecutor(
+                max_workers=int(os.getenv("SCRAPER_MAX_WORKERS", "6")),
+                thread_name_prefix="page-fetch",
+            )
+            atexit.register(_page_executor.shutdown, wait=False, cancel_futures=True)
+        return _page_executor
+
+_scrape_cache = None
+
+def get_scrape_cache():
+    """Returns the process-wide cache of search result pages and fetched pages, or None when disabled."""
+    global _scrape_cache
+    if not _env_flag("SCRAPER_CACHE", "true"):
+        return None
+    with _shared_pool_lock:
+        if _scrape_cache is None:
+            _scrape_cache = DiskCache(
+                os.getenv("SCRAPER_CACHE_PATH", "./cache/scrape_cache.sqlite3"),
+                max_bytes=int(os.getenv("SCRAPER_CACHE_MAX_MB", "200")) * 1024 * 1024,
+            )
+            atexit.register(_scrape_cache.close)
+        return _scrape_cache
+
+def normalize_query(query):
+    return " ".join(query.lower().split())
+
+def normalize_url(url):
+    parsed = urlparse(url.strip())
+    return parsed._replace(scheme=parsed.scheme.lower(), netloc=parsed.netloc.lower(), fragment="").geturl()
+
+@contextmanager
+def host_slot(url):
+    """Limits how many pages are fetched from the same host at once."""
+    with _host_slots_lock:
+        slot = _host_slots[urlparse(url).netloc.lower()]
+    with slot:
+        yield
+
+# Only text that meets one of these conditions is kept:
+# 1. It is longer than 100 characters.
+# 2. It is at least 50 characters long, contains at least 4 spaces,
+#    and consists only of allowed characters.
+# Each kept line must also have more than 50 non-whitespace characters.
+ALLOWED_TEXT_PATTERN = re.compile(r'^[A-Za-z0-9\s\.,!\?\'":;\-]+$')
+NON_CONTENT_TAGS = ("script", "style", "noscript", "template")
+
+def _parse_html(html):
+    if not html or not html.strip():
+        return None
+    try:
+        try:
+            return lxml.html.document_fromstring(html)
+        except ValueError:
+            # lxml refuses str input that carries an XML encoding declaration.
+            return lxml.html.document_fromstring(html.encode("utf-8"))
+    except etree.ParserError:
+        return None
+
+def _element_text(element, separator=" "):
+    return separator.join(text.strip() for text in element.itertext() if text.strip())
+
+def _has_enough_text(line):
+    return len("".join(line.split())) > 50
+
+def extract_relevant_text(html):
+    """
+    Returns the article-like text blocks of a page, one paragraph per line separated by blank lines.
+    Blocks come from <p>, <b> and <article> tags in document order. Nested matches are not repeated:
+    an <article> is only used directly when it has no <p> of its own, and <b> inside a <p> or
+    inside such an <article> is covered by its parent.
+    """
+    root = _parse_html(html)
+    if root is None:
+        return ""
+    etree.strip_elements(root, etree.Comment, *NON_CONTENT_TAGS, with_tail=False)
+    seen = set()
+    lines = []
+    text_articles = set()
+    for element in root.iter("p", "article", "b"):
+        tag = element.tag
+        if tag == "b":
+            if any(ancestor.tag == "p" or (ancestor.tag == "article" and ancestor in text_articles)
+                   for ancestor in element.iterancestors()):
+                continue
+        elif tag == "article":
+            if next(element.iter("p"), None) is not None:
+                continue
+            text_articles.add(element)
+        txt = _element_text(element)
+        if not txt or txt in seen:
+            continue
+        if len(txt) >= 100 or (len(txt) >= 50 and txt.count(" ") >= 4 and ALLOWED_TEXT_PATTERN.match(txt)):
+            seen.add(txt)
+            lines.extend(line for line in txt.splitlines() if _has_enough_text(line))
+    return "\n\n".join(lines)
+
+def _has_class(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+def unwrap_redirect(href):
+    # The HTML endpoint links through //duckduckgo.com/l/?uddg=<target>.
+    parsed = urlparse(href)
+    if parsed.path == "/l/":
+        target = parse_qs(parsed.query).get("uddg")
+        if target:
+            return target[0]
+    if href.startswith("//"):
+        return "https:" + href
+    return href
+
+def parse_search_results(html):
+    """Returns the organic results (link, title, snippet) of a DuckDuckGo result page."""
+    root = _parse_html(html)
+    if root is None:
+        return []
+    results = []
+
+    # Results from the HTML-only endpoint (html.duckduckgo.com).
+    for a_tag in root.xpath(f"//a[{_has_class('result__a')}][@href]"):
+        container = next(iter(a_tag.xpath(f"ancestor::div[{_has_class('result')}][1]")), None)
+        if container is not None and "result--ad" in container.get("class", "").split():
+            continue
+        snippet_tag = next(iter(container.xpath(f".//*[{_has_class('result__snippet')}]")), None) if container is not None else None
+        results.append({
+            "link": unwrap_redirect(a_tag.get("href")),
+            "title": _element_text(a_tag, separator=""),
+            "snippet": _element_text(snippet_tag) if snippet_tag is not None else "No snippet"
+        })
+    if results:
+        return results
+
+    # Look for h2 elements with a unique class substring from our sample.
+    # These classes may need to be updated periodically.
+    for header in root.xpath("//h2[contains(@class, 'LnpumSThxEWMIsDdAT17')]"):
+        a_tag = next(iter(header.xpath(".//a[@href]")), None)
+        if a_tag is None:
+            continue
+        snippet_div = next(iter(header.xpath("following::div[contains(@class, 'E2eLOJr8HctVnDOTM8fs')][1]")), None)
+        results.append({
+            "link": a_tag.get("href"),
+            "title": _element_text(a_tag, separator=""),
+            "snippet": _element_text(snippet_div) if snippet_div is not None else "No snippet"
+        })
+    return results
+
+class SearchBackend(ABC):
+    """
+    What SearchResearcher needs from a search backend (see search_backends.get_search_backend).
+    1) `select_results(query, limit)` returns up to `limit` (by default `max_results`) results
+       (dicts with link, title and snippet).
+    2) `submit_page(result)` returns a future resolving to the text of the result's document;
+       by default it calls `fetch_page_text` right away.
+    3) `webSearch_text` is built on those two.
+    """
+    max_results = 3
+    page_timeout = 30.0
+
+    @abstractmethod
+    def select_results(self, query, limit=None):
+        pass
+
+    @abstractmethod
+    def fetch_page_text(self, link):
+        pass
+
+    def submit_page(self, result):
+        future = Future()
+        try:
+            future.set_result(self.fetch_page_text(result["link"]))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def webSearch_text(self, query):
+        """
+        Returns the text of the top results for the query, fetched concurrently where the backend allows it.
+        A page that is not done within `page_timeout` seconds contributes no text.
+        """
+        results = self.select_results(query)
+        if not results:
+            return "No search results found."
+        futures = [self.submit_page(result) for result in results]
+        wait(futures, timeout=self.page_timeout)
+        texts = []
+        for result, future in zip(results, futures):
+            text = ""
+            if not future.done():
+                future.cancel()
+                logger.info(f"{type(self).__name__}: Timed out fetching {result['link']}.")
+            elif future.exception() is not None:
+                logger.error(f"{type(self).__name__}: Error fetching {result['link']}: {future.exception()}")
+            else:
+                text = future.result()
+            texts.append(text)
+        return "".join(text + "\n\n" for text in texts)
+
+class WebSearchScraper(SearchBackend):
     def __init__(self):
         self.chrome_options = Options()
         # Uncomment headless to run without a visible browser window.
@@ -17,116 +460,164 @@ class WebSearchScraper:
         # Suppress logging
         self.chrome_options.add_argument("--log-level=3")
         self.chrome_options.add_experimental_option("excludeSwitches", ["enable-logging"])
-        self.chrome_options.add_argument(
-            "user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) "
-            "Chrome/115.0 Safari/537.36"
-        )
+        self.chrome_options.add_argument(f"user-agent={USER_AGENT}")
+        self.driver_pool = get_driver_pool(self.chrome_options)
+        # The HTTP tier is tried first; Selenium is only used when it fails or the page needs JavaScript.
+        self.use_http = _env_flag("SCRAPER_USE_HTTP", "true")
+        self.http = HttpFetcher(timeout=float(os.getenv("SCRAPER_HTTP_TIMEOUT", "10")))
+        self.wait_timeout = float(os.getenv("SCRAPER_WAIT_TIMEOUT", "10"))
+        self.search_url = os.getenv("DUCKDUCKGO_URL", "https://duckduckgo.com/")
+        self.search_html_url = os.getenv("DUCKDUCKGO_HTML_URL", "https://html.duckduckgo.com/html/")
+        self.max_results = 3
+        self.page_timeout = float(os.getenv("SCRAPER_PAGE_DEADLINE", "30"))
+        self.executor = get_page_executor()
+        self.cache = get_scrape_cache()
+        self.search_ttl = float(os.getenv("SCRAPER_CACHE_SEARCH_TTL", "21600"))
+        self.page_ttl = float(os.getenv("SCRAPER_CACHE_PAGE_TTL", "604800"))
+
+    def _wait_until(self, driver, condition, timeout=None):
+        try:
+            WebDriverWait(driver, timeout or self.wait_timeout, poll_frequency=0.25).until(condition)
+            return True
+        except TimeoutException:
+            return False
+
+    def _wait_for_page(self, driver, ready_selector=None):
+        self._wait_until(driver, lambda d: d.execute_script("return document.readyState") == "complete")
+        if ready_selector:
+            self._wait_until(driver, EC.presence_of_element_located((By.CSS_SELECTOR, ready_selector)))
+        self._wait_until(driver, _ResourcesSettled())
+
+    def _load(self, driver, url):
+        """Navigates to url; a load that outlasts the page load timeout is stopped and what has loaded is kept."""
+        try:
+            driver.get(url)
+        except TimeoutException:
+            logger.info(f"WebSearchScraper: Page load timed out for {url}; using the partially loaded page.")
+            if not self.driver_pool.stop_loading(driver):
+                raise
 
     def duckduckgo_search_scrape(self, query):
-        driver = webdriver.Chrome(options=self.chrome_options)
-        driver.get("https://duckduckgo.com")
-        time.sleep(2)
-        search_box = driver.find_element("name", "q")
-        search_box.clear()
-        search_box.send_keys(query)
-        search_box.send_keys(Keys.RETURN)
-        time.sleep(10)  # Wait for results to load
-        html = driver.page_source
-        driver.quit()
+        with tracer.span("search.render", query=query), self.driver_pool.driver() as driver:
+            self._load(driver, f"{self.search_url}?q={quote_plus(query)}")
+            self._wait_for_page(driver, ready_selector="article[data-testid='result'], h2 a[href]")
+            html = driver.page_source
         return html
 
-    def parse_search_results(self, html):
-        soup = BeautifulSoup(html, "html.parser")
+    def duckduckgo_html_search(self, query):
+        with host_slot(self.search_html_url), tracer.span("search.http", query=query):
+            return self.http.get(self.search_html_url, params={"q": query})
+
+    def search_results(self, query):
+        """
+        Parses DuckDuckGo results, trying the cache, then the HTML endpoint over HTTP, then the browser.
+        Result pages that parse to at least one result are cached for `search_ttl` seconds.
+        """
+        cache_key = f"search_html:{normalize_query(query)}"
+        if self.cache:
+            html = self.cache.get(cache_key)
+            if html is not None:
+                return self.parse_search_results(html)
         results = []
-        
-        # Look for h2 elements with a unique class substring from our sample.
-        # These classes may need to be updated periodically.
-        for header in soup.find_all("h2", class_=lambda c: c and "LnpumSThxEWMIsDdAT17" in c):
-            a_tag = header.find("a", href=True)
-            if not a_tag:
-                continue
-            link = a_tag["href"]
-            title = a_tag.get_text(strip=True)
-            snippet_div = header.find_next("div", class_=lambda c: c and "E2eLOJr8HctVnDOTM8fs" in c)
-            snippet = snippet_div.get_text(separator=" ", strip=True) if snippet_div else "No snippet"
-            results.append({
-                "link": link,
-                "title": title,
-                "snippet": snippet
-            })
+        if self.use_http:
+            try:
+                html = self.duckduckgo_html_search(query) or ""
+                results = self.parse_search_results(html)
+                if not results:
+                    logger.info(f"WebSearchScraper: No HTTP results for '{query}', falling back to Selenium.")
+            except requests.RequestException as e:
+                logger.info(f"WebSearchScraper: HTTP search failed for '{query}' ({e}), falling back to Selenium.")
+        if not results:
+            html = self.duckduckgo_search_scrape(query)
+            results = self.parse_search_results(html)
+        if self.cache and results:
+            self.cache.set(cache_key, html, ttl=self.search_ttl)
         return results
 
+    def parse_search_results(self, html):
+        with tracer.span("search.parse", html_chars=len(html)):
+            return parse_search_results(html)
+
+    def render_page(self, url):
+        with tracer.span("page.render", url=url), self.driver_pool.driver() as driver:
+            print(f"Scraping: {url}")
+            self._load(driver, url)
+            self._wait_for_page(driver, ready_selector="p, article")
+            return driver.page_source
+
     def scrape_page_content(self, url):
-        options = Options()\
-        
-        # Uncomment to view the Selenium Browser
-        # options.add_argument("--headless")
-        options.add_argument("--disable-gpu")
-
-        options.add_argument("--no-sandbox")
-        options.add_argument("--disable-dev-shm-usage")
-        options.add_argument("--log-level=3")
-        options.add_experimental_option("excludeSwitches", ["enable-logging"])
-        options.add_argument(
-            "user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) "
-            "Chrome/115.0 Safari/537.36"
-        )
-        driver = webdriver.Chrome(options=options)
         try:
-            print(f"Scraping: {url}")
-            driver.get(url)
-            time.sleep(5)  # Wait for page content to load
-            html = driver.page_source
+            html = self.render_page(url)
         except Exception as e:
             html = f"Error retrieving content from {url}: {e}"
-        driver.quit()
         return html
 
+    def _download_page(self, url):
+        """
+        Returns (html, text) for a result page; html is None when there is nothing worth caching.
+        Static pages are served by the HTTP tier; pages that yield no text without JavaScript go through Selenium.
+        """
+        if self.use_http:
+            try:
+                with tracer.span("page.http", url=url):
+                    html = self.http.get(url)
+                if html is None:
+                    return "", ""
+                text = self.extract_relevant_text(html)
+                if text:
+                    return html, text
+                logger.info(f"WebSearchScraper: No static content at {url}, rendering with Selenium.")
+            except requests.RequestException as e:
+                logger.info(f"WebSearchScraper: HTTP fetch failed for {url} ({e}), rendering with Selenium.")
+        try:
+            html = self.render_page(url)
+        except Exception as e:
+            logger.error(f"WebSearchScraper: Error retrieving content from {url}: {e}")
+            return None, ""
+        return html, self.extract_relevant_text(html)
+
+    def fetch_page_text(self, url):
+        """Returns the relevant text of a result page, from the cache when possible."""
+        url_key = normalize_url(url)
+        if self.cache:
+            text = self.cache.get(f"page_text:{url_key}")
+            if text is not None:
+                return text
+            html = self.cache.get(f"page_html:{url_key}")
+            if html is not None:
+                text = self.extract_relevant_text(html)
+                self.cache.set(f"page_text:{url_key}", text, ttl=self.page_ttl)
+                return text
+        html, text = self._download_page(url)
+        if self.cache and html is not None:
+            self.cache.set(f"page_html:{url_key}", html, ttl=self.page_ttl)
+            self.cache.set(f"page_text:{url_key}", text, ttl=self.page_ttl)
+        return text
+
+    def cache_stats(self):
+        return self.cache.stats() if self.cache else {}
+
     def extract_relevant_text(self, html):
-        soup = BeautifulSoup(html, "html.parser")
-        # Only process tags that typically contain article content.
-        allowed_tags = {"p", "article", "b"}
-        allowed_pattern = re.compile(r'^[A-Za-z0-9\s\.,!\?\'":;\-]+$')
-        texts = []
-        for tag in soup.find_all(allowed_tags):
-            txt = tag.get_text(separator=" ", strip=True)
-            if not txt:
-                continue
-            # Only include text if it meets one of these conditions:
-            # 1. It is longer than 100 characters.
-            # 2. It is at least 50 characters long, contains at least 4 spaces,
-            # 3. Consists only of allowed characters.
-            if len(txt) >= 100 or (len(txt) >= 50 and txt.count(" ") >= 4 and allowed_pattern.match(txt)):
-                texts.append(txt)
-        # Remove duplicates.
-        unique_texts = list(dict.fromkeys(texts))
-        # Join list into a multi-line string, then filter the lines.
-        joined_text = "\n".join(unique_texts)
-        filtered_texts = self.filterLines(joined_text)
-        return "\n\n".join(filtered_texts)
+        with tracer.span("page.extract", html_chars=len(html)) as attrs:
+            text = extract_relevant_text(html)
+            attrs["text_chars"] = len(text)
+            return text
 
     def filterLines(self, text):
-        filtered = []
-        for line in text.splitlines():
-            non_whitespace = "".join(line.split())
-            if len(non_whitespace) > 50:
-                filtered.append(line)
-        return filtered
+        return [line for line in text.splitlines() if _has_enough_text(line)]
 
-    def webSearch_text(self, query):
-        search_html = self.duckduckgo_search_scrape(query)
-        results = self.parse_search_results(search_html)
-        if not results:
-            return "No search results found."
-        aggregated_text = ""
-        # Only process the top 3 search results.
-        for result in results[:3]:
-            page_html = self.scrape_page_content(result["link"])
-            relevant_text = self.extract_relevant_text(page_html)
-            aggregated_text += relevant_text + "\n\n"
-        return aggregated_text
+    def _fetch_page_limited(self, url):
+        with host_slot(url):
+            return self.fetch_page_text(url)
+
+    def submit_page(self, result):
+        """Starts fetching one result page on the shared page workers; the future resolves to the page text."""
+        return self.executor.submit(propagate(self._fetch_page_limited), result["link"])
+
+    def select_results(self, query, limit=None):
+        """Returns the top `limit` (by default `max_results`) search results for the query."""
+        # Only process the top search results.
+        return self.search_results(query)[:limit or self.max_results]
 
 # Example usage:
 if __name__ == "__main__":
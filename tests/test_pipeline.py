@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+import os
+import sys
+import time
+import random
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dedup import DedupIndex
+from pipeline import ResearchPipeline
+from ranking import SnippetRanker
+
+SUBQUERIES = ["first subquery", "second subquery", "third subquery"]
+
+def delay(seed, key, longest=0.02):
+    return random.Random(f"{seed}:{key}").uniform(0, longest)
+
+def page_text(link, sentences=3):
+    name = link.replace("/", "_")
+    return " ".join(" ".join(f"{name}_word{s}_{i}" for i in range(12)) + "." for s in range(sentences))
+
+class StubScraper:
+    """Fetches pages on its own workers after a delay chosen per link; links in `stalled` never finish."""
+    def __init__(self, seed=0, max_results=3, page_timeout=5.0, workers=3, page_delay=0.02, stalled=()):
+        self.seed = seed
+        self.max_results = max_results
+        self.page_timeout = page_timeout
+        self.page_delay = page_delay
+        self.stalled = set(stalled)
+        self.release = threading.Event()
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.lock = threading.Lock()
+        self.fetched = []
+        self.futures = []
+
+    def fetch_page_text(self, link):
+        with self.lock:
+            self.fetched.append(link)
+        if link in self.stalled:
+            self.release.wait()
+        else:
+            time.sleep(delay(self.seed, link, self.page_delay))
+        return page_text(link)
+
+    def submit_page(self, result):
+        future = self.executor.submit(self.fetch_page_text, result["link"])
+        self.futures.append(future)
+        return future
+
+    def close(self):
+        self.release.set()
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+class StubSearchResearcher:
+    def __init__(self, scraper, seed=0):
+        self.scraper = scraper
+        self.seed = seed
+        self.searched = []
+
+    def search_result_links(self, subquery, limit=None):
+        self.searched.append(subquery)
+        time.sleep(delay(self.seed, subquery))
+        return [{"link": f"{subquery}/{i}", "title": f"{subquery} {i}", "snippet": ""} for i in range(4)]
+
+class StubReportResearcher:
+    def __init__(self, seed=0):
+        self.seed = seed
+
+    def batch_snippets(self, snippets):
+        return [snippets[i:i + 2] for i in range(0, len(snippets), 2)]
+
+    def assess_batch_limited(self, user_query, batch):
+        time.sleep(delay(self.seed, batch[0]))
+        return [f"note on {snippet[:20]}" for snippet in batch]
+
+def make_pipeline(scraper, seed=0, **kwargs):
+    return ResearchPipeline(StubSearchResearcher(scraper, seed), StubReportResearcher(seed),
+                            SnippetRanker(method="none"), DedupIndex(), {}, chunk_tokens=15, chunk_overlap=0,
+                            **kwargs)
+
+def summarize(event):
+    if event["type"] == "page":
+        return ("page", event["subquery"], event["page"]["link"], bool(event["page"]["text"]))
+    if event["type"] == "pages":
+        return ("pages", event["subquery"], len(event["pages"]), event["snippets"])
+    return ("assessed", tuple(event["batch"]), tuple(event["summaries"]))
+
+class ResearchPipelineTest(unittest.TestCase):
+    def run_events(self, seed):
+        scraper = StubScraper(seed=seed)
+        try:
+            pipeline = make_pipeline(scraper, seed=seed, window=2, max_pending=2)
+            return [summarize(event) for event in pipeline.run("user query", SUBQUERIES)]
+        finally:
+            scraper.close()
+
+    def test_events_and_batches_are_in_deterministic_order(self):
+        # Assessments overlap with fetching, so only where the two streams interleave may vary between runs.
+        expected = self.run_events(seed=0)
+        expected_pages = [event for event in expected if event[0] != "assessed"]
+        expected_batches = [event for event in expected if event[0] == "assessed"]
+        for seed in range(1, 4):
+            events = self.run_events(seed)
+            self.assertEqual([event for event in events if event[0] != "assessed"], expected_pages)
+            self.assertEqual([event for event in events if event[0] == "assessed"], expected_batches)
+        pages = [event for event in expected_pages if event[0] == "page"]
+        self.assertEqual([event[2] for event in pages], [f"{s}/{i}" for s in SUBQUERIES for i in range(3)])
+        self.assertEqual([event[1] for event in expected_pages if event[0] == "pages"], SUBQUERIES)
+        snippets = [snippet for event in expected_batches for snippet in event[1]]
+        self.assertEqual(len(snippets), sum(event[3] for event in expected_pages if event[0] == "pages"))
+        self.assertTrue(snippets[0].startswith("first subquery_0_word0_0"))
+
+    def test_closing_the_generator_cancels_pending_work(self):
+        scraper = StubScraper(workers=1, page_delay=0.2)
+        try:
+            events = make_pipeline(scraper, window=2).run("user query", SUBQUERIES)
+            self.assertEqual(next(events)["type"], "page")
+            events.close()
+            self.assertTrue(any(future.cancelled() for future in scraper.futures))
+            time.sleep(0.5)
+            self.assertLess(len(scraper.fetched), len(scraper.futures))
+        finally:
+            scraper.close()
+
+    def test_stalled_page_is_dropped_after_page_timeout(self):
+        scraper = StubScraper(page_timeout=0.3, stalled={"first subquery/1"})
+        try:
+            started = time.monotonic()
+            events = [summarize(event) for event in make_pipeline(scraper).run("user query", SUBQUERIES[:1])]
+            self.assertLess(time.monotonic() - started, 2.0)
+        finally:
+            scraper.close()
+        pages = [event for event in events if event[0] == "page"]
+        self.assertEqual([event[2] for event in pages], [f"first subquery/{i}" for i in range(3)])
+        self.assertEqual([event[3] for event in pages], [True, False, True])
+
+    def test_recorded_pages_are_not_fetched_again(self):
+        scraper = StubScraper()
+        recorded = {"first subquery": [
+            {"link": "first subquery/0", "title": "", "snippet": "", "text": page_text("first subquery/0")},
+            {"link": "first subquery/1", "title": "", "snippet": ""},
+        ]}
+        pipeline = make_pipeline(scraper)
+        try:
+            events = list(pipeline.run("user query", SUBQUERIES[:2], recorded=recorded))
+        finally:
+            scraper.close()
+        self.assertEqual(pipeline.search_researcher.searched, ["second subquery"])
+        self.assertNotIn("first subquery/0", scraper.fetched)
+        self.assertIn("first subquery/1", scraper.fetched)
+        pages = [event["page"] for event in events if event["type"] == "page"]
+        self.assertEqual(pages[0]["text"], page_text("first subquery/0"))
+        self.assertEqual(len(pages), 5)
+
+if __name__ == "__main__":
+    unittest.main()
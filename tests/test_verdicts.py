@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import normalize_verdict
+
+NEGATIVE = [
+    "",
+    "NO",
+    "No.",
+    "none",
+    "N/A",
+    "Irrelevant.",
+    "Not relevant",
+    "No relevant information.",
+    "Nothing useful here.",
+    "No - not relevant to the query.",
+    "No, this snippet is not related.",
+    "None: no useful information.",
+    "None of the snippet is relevant.",
+    "The snippet is not relevant.",
+    "This text isn't relevant to the user's question.",
+    "There is no relevant information.",
+    "The snippet does not contain any useful information about the topic.",
+]
+
+KEPT = [
+    "No, the Fed raised rates in 2022.",
+    "No vaccine has been approved for the virus yet.",
+    "None of the three bidders met the deadline, the ministry said.",
+    "Nonetheless, exports grew 4% in March.",
+    "The study found no relevant side effects in 300 patients.",
+    "Rates are not relevant to the index. The index closed at 38,654 on Friday.",
+    "The DJIA closed at 38,654 on Friday.",
+]
+
+class NormalizeVerdictTest(unittest.TestCase):
+    def test_negative_replies_become_no(self):
+        for response in NEGATIVE:
+            with self.subTest(response=response):
+                self.assertEqual(normalize_verdict(response), "NO")
+
+    def test_extracts_are_kept(self):
+        for response in KEPT:
+            with self.subTest(response=response):
+                self.assertEqual(normalize_verdict(f"  {response}\n"), response)
+
+if __name__ == "__main__":
+    unittest.main()
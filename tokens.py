@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+import re
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    _encoding = None
+
+WORD_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+def estimate_tokens(text):
+    """
+    Counts tokens with tiktoken when it is installed. Otherwise estimates them from
+    words and punctuation, which slightly overcounts for English text with LLaMA-style tokenizers.
+    """
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return int(len(WORD_PATTERN.findall(text)) * 1.3) + 1
+
+def pack_by_budget(texts, budget):
+    """Groups consecutive texts so each group's estimated tokens stay within the budget (an oversized text is kept alone)."""
+    groups = []
+    group = []
+    group_tokens = 0
+    for text in texts:
+        tokens = estimate_tokens(text)
+        if group and group_tokens + tokens > budget:
+            groups.append(group)
+            group = []
+            group_tokens = 0
+        group.append(text)
+        group_tokens += tokens
+    if group:
+        groups.append(group)
+    return groups
+
+def truncate_to_tokens(text, max_tokens):
+    """Cuts text to its first `max_tokens` estimated tokens (see estimate_tokens)."""
+    if max_tokens <= 0:
+        return ""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    if _encoding is not None:
+        return _encoding.decode(_encoding.encode(text, disallowed_special=())[:max_tokens])
+    words = list(WORD_PATTERN.finditer(text))
+    keep = int((max_tokens - 1) / 1.3)
+    return text[:words[keep - 1].end()] if keep > 0 else ""
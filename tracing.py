@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+import os
+import json
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from tokens import estimate_tokens
+
+_current_run = contextvars.ContextVar("trace_run", default=None)
+
+class Tracer:
+    """
+    Records timed spans for research runs.
+    1) `span(name, **attrs)` times a block; attributes can be added to the yielded dict inside the block.
+    2) `run(run_id)` and `iter_run(generator, run_id)` tag spans with the run ID; `propagate(fn)`
+       carries the run ID into worker threads.
+    3) A run's spans can be exported as JSON lines or as a Chrome trace (chrome://tracing, Perfetto),
+       and summarized as a table of per-stage totals.
+    Spans are only recorded while `enabled` is true.
+    """
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._spans = []
+        self._origin = time.perf_counter() - time.time()
+
+    @contextmanager
+    def span(self, name, **attrs):
+        if not self.enabled:
+            yield attrs
+            return
+        start = time.perf_counter()
+        try:
+            yield attrs
+        except BaseException as e:
+            attrs["error"] = repr(e)
+            raise
+        finally:
+            end = time.perf_counter()
+            thread = threading.current_thread()
+            record = {"name": name, "run": _current_run.get(), "start": start - self._origin,
+                      "duration": end - start, "thread": thread.ident, "thread_name": thread.name, "attrs": attrs}
+            with self._lock:
+                self._spans.append(record)
+
+    @contextmanager
+    def run(self, run_id):
+        token = _current_run.set(run_id)
+        try:
+            yield
+        finally:
+            _current_run.reset(token)
+
+    def iter_run(self, generator, run_id):
+        """
+        Iterates the generator with each step tagged with the run ID. Unlike `run`, this stays correct
+        when consecutive steps are resumed from different threads or contexts.
+        """
+        while True:
+            token = _current_run.set(run_id)
+            try:
+                item = next(generator)
+            except StopIteration:
+                return
+            finally:
+                _current_run.reset(token)
+            yield item
+
+    def spans(self, run_id=None):
+        with self._lock:
+            return [span for span in self._spans if run_id is None or span["run"] == run_id]
+
+    def clear(self, run_id=None):
+        with self._lock:
+            self._spans = [span for span in self._spans if run_id is not None and span["run"] != run_id]
+
+    def export_jsonl(self, path, run_id=None):
+        with open(path, "w", encoding="utf-8") as f:
+            for span in self.spans(run_id):
+                f.write(json.dumps(span, default=str) + "\n")
+
+    def export_chrome_trace(self, path, run_id=None):
+        spans = self.spans(run_id)
+        events = [{"name": span["name"], "cat": span["name"].split(".", 1)[0], "ph": "X",
+                   "ts": span["start"] * 1e6, "dur": span["duration"] * 1e6, "pid": os.getpid(),
+                   "tid": span["thread"], "args": span["attrs"]} for span in spans]
+        events += [{"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid, "args": {"name": name}}
+                   for tid, name in {span["thread"]: span["thread_name"] for span in spans}.items()]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, default=str)
+
+    def summary(self, run_id=None):
+        """Returns a text table with the count, total, mean and max duration of each span name."""
+        totals = {}
+        for span in self.spans(run_id):
+            entry = totals.setdefault(span["name"], [0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += span["duration"]
+            entry[2] = max(entry[2], span["duration"])
+        lines = [f"{'stage':<24} {'count':>6} {'total s':>9} {'mean ms':>9} {'max ms':>9}"]
+        for name, (count, total, longest) in sorted(totals.items(), key=lambda item: -item[1][1]):
+            lines.append(f"{name:<24} {count:>6} {total:>9.2f} {total / count * 1000:>9.1f} {longest * 1000:>9.1f}")
+        return "\n".join(lines)
+
+tracer = Tracer()
+
+def propagate(fn):
+    """Wraps fn so it records spans under the caller's run when executed in another thread."""
+    run_id = _current_run.get()
+    def wrapper(*args, **kwargs):
+        token = _current_run.set(run_id)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _current_run.reset(token)
+    return wrapper
+
+class TracedLLM:
+    """Wraps a LangChain LLM and records an 'llm.call' span for every invoke and stream."""
+    def __init__(self, llm, llm_type, model_name):
+        self.llm = llm
+        self.llm_type = llm_type
+        self.model_name = model_name
+
+    def _prompt_text(self, prompt):
+        if isinstance(prompt, str):
+            return prompt
+        return "\n".join(message.get("content", "") if isinstance(message, dict) else str(message) for message in prompt)
+
+    def invoke(self, prompt, **kwargs):
+        with tracer.span("llm.call", backend=self.llm_type, model=self.model_name) as attrs:
+            response = self.llm.invoke(prompt, **kwargs)
+            if tracer.enabled:
+                prompt_text = self._prompt_text(prompt)
+                attrs.update(prompt_chars=len(prompt_text), prompt_tokens=estimate_tokens(prompt_text),
+                             response_chars=len(response), response_tokens=estimate_tokens(response))
+            return response
+
+    __call__ = invoke
+
+    def stream(self, prompt, **kwargs):
+        with tracer.span("llm.stream", backend=self.llm_type, model=self.model_name) as attrs:
+            started = time.perf_counter()
+            chunks = []
+            for chunk in self.llm.stream(prompt, **kwargs):
+                if not chunks:
+                    attrs["first_chunk_ms"] = (time.perf_counter() - started) * 1000
+                chunks.append(chunk)
+                yield chunk
+            if tracer.enabled:
+                prompt_text = self._prompt_text(prompt)
+                response = "".join(chunks)
+                attrs.update(prompt_chars=len(prompt_text), prompt_tokens=estimate_tokens(prompt_text),
+                             response_chars=len(response), response_tokens=estimate_tokens(response))
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)